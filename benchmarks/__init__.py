@@ -0,0 +1,6 @@
+"""Benchmarks for kerno. These are not shipped with the package.
+
+Run the serialization benchmark suite with::
+
+    python -m benchmarks --help
+"""
@@ -0,0 +1,53 @@
+"""Command line interface of the serialization benchmark suite."""
+
+from argparse import ArgumentParser
+import json
+import sys
+
+from benchmarks.serialization import SERIALIZERS, FIELD_TYPES, run_suite
+
+
+def main(argv: list[str] | None = None) -> None:  # noqa
+    parser = ArgumentParser(
+        prog="python -m benchmarks",
+        description="Compare jsonright and to_dict serialization speed and memory.",
+    )
+    parser.add_argument(
+        "--rows", default="1000,10000,100000", help="entity counts, comma separated"
+    )
+    parser.add_argument(
+        "--fields", default="5,20", help="field counts, comma separated"
+    )
+    parser.add_argument(
+        "--types",
+        default=",".join(FIELD_TYPES),
+        help="field types among: " + ", ".join(FIELD_TYPES),
+    )
+    parser.add_argument(
+        "--serializers",
+        default=",".join(SERIALIZERS),
+        help="serializers among: " + ", ".join(SERIALIZERS),
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per case")
+    parser.add_argument(
+        "--output", default="-", help="JSON file to write; '-' is stdout"
+    )
+    args = parser.parse_args(argv)
+    report = run_suite(
+        rows=[int(n) for n in args.rows.split(",")],
+        fields=[int(n) for n in args.fields.split(",")],
+        types=args.types.split(","),
+        serializers=args.serializers.split(","),
+        repeat=args.repeat,
+        progress=sys.stderr,
+    )
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    else:
+        with open(args.output, "w") as stream:
+            json.dump(report, stream, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark the pivot of jsonright() on a long list of entities.
+
+Compares the current single-pass pivot against the previous algorithm,
+which encoded the first entity twice and dispatched on every cell.
+
+Run with::
+
+    python -m benchmarks.jsonright_pivot [number_of_rows]
+"""
+
+from datetime import datetime
+from decimal import Decimal
+import sys
+from time import perf_counter
+
+from kerno.typing import DictStr
+from kerno.web.jsonright import entity2dict, jsonright
+
+
+class Product:  # noqa
+    def __init__(self, id: int) -> None:  # noqa
+        self.id = id
+        self.name = f"Product {id}"
+        self.status = "active" if id % 3 else "inactive"
+        self.price = Decimal("9.99")
+        self.stock = id % 50
+        self.created = datetime(2020, 1, 1)
+
+
+@jsonright.register(Product)
+def _(obj, peto, features=(), **kw) -> DictStr:
+    return entity2dict(obj)
+
+
+def legacy_pivot(obj, peto, features=(), **kw) -> list:
+    """Reproduce the pivot algorithm used before the single-pass rewrite."""
+    first_dict = jsonright(obj[0], peto, features, **kw)
+    ret = [[key] for key in first_dict]
+    for entity in obj:
+        adict = jsonright(entity, peto, features, **kw)
+        for alist in ret:
+            alist.append(jsonright(adict[alist[0]], peto, features, **kw))
+    return ret
+
+
+def measure(fn, payload) -> float:
+    """Return the best of 3 wall-clock timings of ``fn(payload, None)``."""
+    timings = []
+    for _ in range(3):
+        start = perf_counter()
+        fn(payload, None)
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def main(rows: int = 100_000) -> None:  # noqa
+    payload = [Product(i) for i in range(rows)]
+    assert legacy_pivot(payload, None) == jsonright(payload, None)
+    legacy = measure(legacy_pivot, payload)
+    current = measure(jsonright, payload)
+    print(f"Pivoting {rows} entities:")
+    print(f"  legacy:  {legacy:.3f} s")
+    print(f"  current: {current:.3f} s  ({legacy / current:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,35 @@
+"""Benchmark pivoting query rows against pivoting the equivalent entities.
+
+Column-only queries return named-tuple-like rows. Before ``pivot_rows()``
+they had to be turned into objects or dicts with a ``jsonright()``
+implementation; now they are pivoted straight from the tuples.
+
+Run with::
+
+    python -m benchmarks.jsonright_rows [number_of_rows]
+"""
+
+from collections import namedtuple
+import sys
+
+from benchmarks.jsonright_pivot import Product, measure
+from kerno.web.jsonright import jsonright
+
+ProductRow = namedtuple(
+    "ProductRow", ["id", "name", "status", "price", "stock", "created"]
+)
+
+
+def main(rows: int = 100_000) -> None:  # noqa
+    entities = [Product(i) for i in range(rows)]
+    tuples = [ProductRow(**vars(entity)) for entity in entities]
+    assert jsonright(tuples, None) == jsonright(entities, None)
+    entity_path = measure(jsonright, entities)
+    row_path = measure(jsonright, tuples)
+    print(f"Pivoting {rows} rows:")
+    print(f"  entities: {entity_path:.3f} s")
+    print(f"  rows:     {row_path:.3f} s  ({entity_path / row_path:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
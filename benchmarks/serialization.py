@@ -0,0 +1,165 @@
+"""Benchmark jsonright against to_dict on generated entities.
+
+Each case is a combination of entity count, field count, field type and
+serializer. For each case we report throughput (rows per second),
+per-row latency and the peak memory allocated while serializing,
+measured with tracemalloc in a separate run so it does not distort
+the timings.
+
+The report is a dictionary, ready to be dumped as JSON, so results can
+be compared between releases.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from importlib.metadata import PackageNotFoundError, version
+import json
+import platform
+from time import perf_counter
+import tracemalloc
+from typing import Any, Callable, TextIO
+import warnings
+
+from kerno.typing import DictStr
+from kerno.web.jsonright import entity2dict, jsonright, jsonright_stream
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from kerno.web.to_dict import to_dict
+
+
+def _value(field_type: str, row: int, column: int) -> Any:
+    """Return the value of one cell of a generated entity."""
+    if field_type == "scalars":
+        return f"text {row}" if column % 2 else row * column
+    elif field_type == "dates":
+        return datetime(2020, 1, 1 + column % 28, row % 24)
+    elif field_type == "decimals":
+        return Decimal(row) / 100
+    elif field_type == "nested":
+        return {"row": row, "column": column, "tags": ["a", "b"]}
+    raise ValueError(f"Unknown field type: {field_type}")
+
+
+FIELD_TYPES = ("scalars", "dates", "decimals", "nested")
+
+
+class Entity:
+    """Base class of the generated entities."""
+
+    def __init__(self, values: DictStr) -> None:  # noqa
+        self.__dict__.update(values)
+
+
+@jsonright.register(Entity)
+def _(obj, peto, features=(), **kw) -> DictStr:
+    if "summary" in features:
+        return entity2dict(obj, keys=("f0", "f1"))
+    return entity2dict(obj)
+
+
+def make_entities(rows: int, fields: int, field_type: str) -> list[Entity]:
+    """Return ``rows`` entities, each with ``fields`` attributes."""
+    return [
+        Entity({f"f{col}": _value(field_type, row, col) for col in range(fields)})
+        for row in range(rows)
+    ]
+
+
+def _jsonright(entities: list) -> str:
+    return json.dumps(jsonright(entities, None))
+
+
+def _jsonright_summary(entities: list) -> str:
+    return json.dumps(jsonright(entities, None, features=("summary",)))
+
+
+def _jsonright_dictionary(entities: list) -> str:
+    return json.dumps(jsonright(entities, None, dictionary=255))
+
+
+def _jsonright_stream(entities: list) -> bytes:
+    return b"".join(jsonright_stream(entities, None))
+
+
+def _to_dict(entities: list) -> str:
+    return json.dumps([to_dict(entity) for entity in entities])
+
+
+SERIALIZERS: dict[str, Callable[[list], Any]] = {
+    "jsonright": _jsonright,
+    "jsonright_summary": _jsonright_summary,
+    "jsonright_dictionary": _jsonright_dictionary,
+    "jsonright_stream": _jsonright_stream,
+    "to_dict": _to_dict,
+}
+
+
+def measure(fn: Callable[[list], Any], entities: list, repeat: int = 3) -> DictStr:
+    """Time ``fn(entities)`` and measure its peak memory allocation."""
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        output = fn(entities)
+        timings.append(perf_counter() - start)
+    best = min(timings)
+    tracemalloc.start()
+    fn(entities)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rows = len(entities)
+    return {
+        "seconds": best,
+        "rows_per_second": rows / best if best else None,
+        "microseconds_per_row": best / rows * 1_000_000,
+        "peak_memory_bytes": peak,
+        "output_bytes": len(output),
+    }
+
+
+def environment() -> DictStr:
+    """Describe where the benchmark ran, to make reports comparable."""
+    try:
+        kerno_version = version("kerno")
+    except PackageNotFoundError:
+        kerno_version = None
+    return {
+        "kerno": kerno_version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "date": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def run_suite(
+    rows: list[int],
+    fields: list[int],
+    types: list[str],
+    serializers: list[str],
+    repeat: int = 3,
+    progress: TextIO | None = None,
+) -> DictStr:
+    """Run every combination of the arguments and return the report."""
+    results = []
+    for field_type in types:
+        for field_count in fields:
+            for row_count in rows:
+                entities = make_entities(row_count, field_count, field_type)
+                for name in serializers:
+                    if progress:
+                        print(
+                            f"{name} {row_count} rows x {field_count} "
+                            f"{field_type} fields",
+                            file=progress,
+                        )
+                    result = {
+                        "serializer": name,
+                        "rows": row_count,
+                        "fields": field_count,
+                        "field_type": field_type,
+                    }
+                    result.update(measure(SERIALIZERS[name], entities, repeat))
+                    results.append(result)
+    return {"environment": environment(), "results": results}
@@ -32,41 +32,777 @@ throw away the hub, replacing its instance.
 The library fires the event by doing::
 
     kerno.events.broadcast(EventUserLoggedIn(peto=peto))
+
+Handlers subscribed to a base class also receive the events of its
+subclasses, so you can subscribe to a whole family of events at once.
+Handlers run in the order they were subscribed, those of the class of
+the event first, then those of its base classes. The handlers of each
+concrete event class are computed on the first broadcast and cached
+until the next subscribe or unsubscribe.
+
+Concurrent handlers
+===================
+
+``broadcast()`` runs the handlers one after another, in the calling thread.
+When handlers do I/O (cache busting, webhooks, audit writes), they can
+run concurrently instead, so the latency is that of the slowest handler
+rather than the sum of all of them:
+
+- ``broadcast_threaded(event)`` runs each handler in the thread pool of
+  the hub, whose size (the concurrency limit) is ``max_workers``.
+- ``await abroadcast(event)`` awaits coroutine handlers concurrently,
+  while the ordinary handlers go to the thread pool.
+
+Both accept a per-handler ``timeout`` in seconds and an ``errors``
+policy. With ``errors="raise"`` (the default), all handlers complete and
+then their exceptions are raised together in an ``ExceptionGroup``.
+With ``errors="collect"`` the exceptions are returned in a list instead.
+A handler that times out counts as a ``TimeoutError``; notice that
+a thread cannot be killed, so a sync handler keeps running after that.
+
+Priorities and cancellation
+===========================
+
+Some handlers must run before others -- authorization vetoes, cheap
+in-memory cache updates. ``subscribe(..., priority=10)`` runs a handler
+before those of lower priority (the default is 0); handlers of the same
+priority run in the order described above. The order is merged on the
+first broadcast after the subscriptions change, then cached, so later
+broadcasts cost the same.
+
+A handler can stop the propagation of an event by raising
+``StopPropagation``; the remaining handlers are skipped and
+``broadcast()`` returns False::
+
+    def veto(event: EventOrderPlaced):
+        if event.order.is_fraud:
+            raise StopPropagation()
+
+    hub.subscribe(EventOrderPlaced, veto, priority=100)
+
+In the concurrent modes, each priority is a lane: the handlers of a lane
+run concurrently, and the next lane starts only after they all finish,
+unless one of them raised ``StopPropagation``.
+
+Events after commit
+===================
+
+Many handlers must not run before the database transaction commits,
+and must not delay the response either. A ``DeferredEvents`` queue has
+the same ``broadcast()`` method as the hub, but only buffers the events.
+After commit, ``flush()`` delivers them in a background thread, in order;
+on rollback, ``discard()`` throws them away.
+
+A SQLAlchemy repository manages such a queue for you: actions just do
+``repo.events.broadcast(event)``. See ``BaseSQLAlchemyRepository.events``.
+
+Batches
+=======
+
+A bulk action may fire thousands of identical events, such as one
+``EntityChanged`` per imported row. A handler whose work is expensive can
+subscribe with ``batch=True``; it then receives a list of events::
+
+    def reindex(events: list[EntityChanged]):
+        search.reindex({event.entity_id for event in events})
+
+    hub.subscribe(EntityChanged, reindex, batch=True,
+                  key=lambda event: event.entity_id)
+
+Events broadcast inside a ``with hub.batching():`` block are grouped per
+batch handler and event class, and each handler is called once, with the
+list, when the block ends. ``key`` (optional) deduplicates the events of
+a group, keeping the last one of each key. With ``window=seconds`` the
+buffered batches are also delivered (on the next broadcast) as soon as
+the oldest of them is that old. Outside of a batching block, a batch
+handler is called with a list of one event. Handlers that did not ask
+for batches are never delayed. The block also covers
+``broadcast_threaded()`` and ``abroadcast()``; batch handlers that are
+coroutine functions need ``async with hub.abatching():`` instead.
+
+Instrumentation
+===============
+
+To find out which subscriber makes a request slow, call
+``hub.instrument()``. From then on, each handler is timed, per event class:
+call count, cumulative and percentile latency, and exception count.
+``hub.instrumentation.snapshot()`` returns a dict (``to_json()`` a string)
+that an admin view can expose. When instrumentation is off (the default),
+handlers are called directly, so it costs nothing.
 """
 
-from typing import Callable
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar, copy_context
+from inspect import isawaitable, iscoroutinefunction, ismethod
+from itertools import chain
+import json
+import logging
+from threading import Lock, RLock
+from time import monotonic, perf_counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+import weakref
+
+logger = logging.getLogger(__name__)
+
+ERROR_POLICIES = ("raise", "collect")
+
+
+class StopPropagation(Exception):
+    """Raised by a handler to prevent the remaining handlers from running."""
+
+
+def _outcome(exceptions: list[BaseException], errors: str) -> list[BaseException]:
+    """Apply the ``errors`` policy to the exceptions raised by handlers."""
+    exceptions = [e for e in exceptions if not isinstance(e, StopPropagation)]
+    if exceptions and errors == "raise":
+        raise BaseExceptionGroup(
+            f"{len(exceptions)} event handler(s) failed.", exceptions
+        )
+    return exceptions
+
+
+class EventBatch:
+    """Events buffered for batch handlers during a ``hub.batching()`` block."""
+
+    def __init__(self, window: float | None = None) -> None:  # noqa
+        self.window = window
+        self.started = 0.0
+        self.groups: dict[tuple["BatchHandler", type], dict[Any, Any]] = {}
+        # Results of coroutine batch handlers, awaited by abatching()
+        self.awaitables: list[Awaitable] = []
+        self._lock = Lock()  # threads of broadcast_threaded() share the batch
+
+    def add(self, handler: "BatchHandler", event) -> None:
+        """Buffer ``event`` for ``handler``, delivering old batches first."""
+        due = None
+        with self._lock:
+            if not self.groups:
+                self.started = monotonic()
+            elif self.window is not None and monotonic() - self.started >= self.window:
+                due, self.groups = self.groups, {}
+                self.started = monotonic()
+            group = self.groups.setdefault((handler, type(event)), {})
+            if handler.key is None:
+                group[len(group)] = event
+            else:  # keep only the last event of each key, in chronological order
+                key = handler.key(event)
+                group.pop(key, None)
+                group[key] = event
+        if due:
+            self._deliver(due)
+
+    def deliver(self) -> None:
+        """Call each batch handler once per event class with its events."""
+        with self._lock:
+            groups, self.groups = self.groups, {}
+        self._deliver(groups)
+
+    def _deliver(self, groups: dict) -> None:
+        for (handler, event_cls), events in groups.items():
+            ret = handler.function(list(events.values()))
+            if isawaitable(ret):
+                self.awaitables.append(ret)
+
+    async def wait(self) -> None:
+        """Await the coroutine batch handlers called so far."""
+        awaitables, self.awaitables = self.awaitables, []
+        await asyncio.gather(*awaitables)
+
+
+class BatchHandler:
+    """Wraps a handler that accepts a list of events."""
+
+    __slots__ = ("function", "key", "scope")
+
+    def __init__(
+        self,
+        function: Callable[[list], Any],
+        key: Callable[[Any], Any] | None,
+        scope: ContextVar,
+    ) -> None:  # noqa
+        self.function = function
+        self.key = key
+        self.scope = scope
+
+    def __call__(self, event) -> None:  # noqa
+        batch = self.scope.get()
+        if batch is None:
+            self.function([event])
+        else:
+            batch.add(self, event)
+
+
+class WeakHandler:
+    """Calls a handler through a weak reference, so it can be collected."""
+
+    __slots__ = ("ref",)
+
+    def __init__(self, ref: weakref.ref) -> None:  # noqa
+        self.ref = ref
+
+    def __call__(self, event) -> Any:  # noqa
+        function = self.ref()
+        if function is not None:
+            return function(event)
+
+
+def _weak_ref(function: Callable, callback: Callable | None = None) -> weakref.ref:
+    """Return a weak reference to ``function``, which may be a bound method.
+
+    A plain weak reference to a bound method would die immediately, since
+    bound methods are created on attribute access; ``WeakMethod`` instead
+    lives as long as the object that owns the method.
+    """
+    if ismethod(function):
+        return weakref.WeakMethod(function, callback)
+    return weakref.ref(function, callback)
+
+
+class _IdentityKey:
+    """Stands for an unhashable handler (or a weak reference to it) in dicts.
+
+    Callable objects that define ``__eq__`` but not ``__hash__`` can still
+    be subscribed; they are then told apart by identity.
+    """
+
+    __slots__ = ("handle", "ident")
+
+    def __init__(self, handle: Any, function: Callable) -> None:  # noqa
+        self.handle = handle
+        self.ident = id(function)
+
+    def __hash__(self) -> int:
+        return self.ident
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _IdentityKey) and other.ident == self.ident
+
+
+def _key(handle: Any, function: Callable) -> Any:
+    """Return ``handle`` if it can be a dict key, else an identity key."""
+    try:
+        hash(handle)
+    except TypeError:
+        return _IdentityKey(handle, function)
+    return handle
+
+
+def handler_name(handler: Any) -> str:
+    """Return a readable name for a handler, unwrapping our wrappers."""
+    if isinstance(handler, _IdentityKey):
+        handler = handler.handle
+    if isinstance(handler, weakref.ref):
+        handler = handler()
+    while isinstance(handler, (BatchHandler, WeakHandler)):
+        handler = (
+            handler.function if isinstance(handler, BatchHandler) else handler.ref()
+        )
+    if handler is None:
+        return "<collected>"
+    name = getattr(handler, "__qualname__", None) or repr(handler)
+    module = getattr(handler, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+class HandlerStats:
+    """Calls, errors and latency of one handler for one event class.
+
+    Percentiles are computed over the most recent ``window`` calls.
+    """
+
+    def __init__(self, window: int = 1000) -> None:  # noqa
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+        self._lock = Lock()
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        """Account for one call that took ``seconds``."""
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.recent.append(seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Return the latency below which ``percent`` of recent calls were."""
+        with self._lock:
+            recent = sorted(self.recent)
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(len(recent) * percent / 100))]
+
+    def as_dict(self) -> dict[str, float]:  # noqa
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "seconds": self.seconds,
+            "mean_seconds": self.seconds / self.calls if self.calls else 0.0,
+            "p50_seconds": self.percentile(50),
+            "p90_seconds": self.percentile(90),
+            "p99_seconds": self.percentile(99),
+            "max_seconds": self.max_seconds,
+        }
+
+
+class TimedHandler:
+    """Calls a handler, recording its latency and failures in ``stats``."""
+
+    __slots__ = ("handler", "stats")
+
+    def __init__(self, handler: Callable, stats: HandlerStats) -> None:  # noqa
+        self.handler = handler
+        self.stats = stats
+
+    def __call__(self, event) -> Any:  # noqa
+        failed = True
+        start = perf_counter()
+        try:
+            ret = self.handler(event)
+            failed = False
+            return ret
+        except StopPropagation:
+            failed = False
+            raise
+        finally:
+            self.stats.record(perf_counter() - start, failed)
+
+
+class Instrumentation:
+    """Statistics of the handlers of a hub, per (event class, handler).
+
+    Each subscription has its own statistics, even when several handlers
+    have the same name (e. g. lambdas, or closures made by one factory);
+    in the snapshot, their names get a suffix such as "#2".
+    """
+
+    def __init__(self, window: int = 1000) -> None:  # noqa
+        self.window = window
+        # Keyed by event class and subscription handle
+        self.stats: dict[tuple[type, Any], HandlerStats] = {}
+        self._names: dict[tuple[type, Any], str] = {}
+
+    def wrap(self, event_cls: type, handle: Any, handler: Callable) -> TimedHandler:
+        """Return ``handler`` timed as a subscriber of ``event_cls``."""
+        key = (event_cls, handle)
+        stats = self.stats.get(key)
+        if stats is None:
+            self._names[key] = handler_name(handle)
+            stats = self.stats[key] = HandlerStats(self.window)
+        return TimedHandler(handler, stats)
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Return the statistics by event class name and handler name."""
+        ret: dict[str, dict[str, dict[str, float]]] = {}
+        for key, stats in list(self.stats.items()):
+            event_cls = key[0]
+            event_name = f"{event_cls.__module__}.{event_cls.__qualname__}"
+            handlers = ret.setdefault(event_name, {})
+            name = base = self._names[key]
+            number = 1
+            while name in handlers:
+                number += 1
+                name = f"{base}#{number}"
+            handlers[name] = stats.as_dict()
+        return ret
+
+    def to_json(self, **kw) -> str:
+        """Return the snapshot as JSON."""
+        return json.dumps(self.snapshot(), **kw)
+
+
+# The handlers of an event class, and the same handlers in priority lanes
+_Table = tuple[tuple[Callable, ...], tuple[tuple[Callable, ...], ...]]
 
 
 class EventHub:
     """A hub for events to be subscribed, fired and removed."""
 
-    def __init__(self) -> None:  # noqa
-        self._events: dict[type, list[Callable]] = {}
+    def __init__(self, max_workers: int = 4) -> None:
+        """``max_workers`` limits how many handlers run in threads at once."""
+        # For each event class and priority, maps the subscribed function
+        # (or a weak reference to it) to the callable to be executed.
+        self._events: dict[type, dict[int, dict[Any, Callable]]] = {}
+        # Dispatch table: for each concrete event class, the handlers of
+        # the class and of its bases, by priority, then in method resolution
+        # order; and the same handlers grouped in lanes of equal priority.
+        self._tables: dict[type, _Table] = {}
+        # Changes to the subscriptions happen under this lock and increment
+        # the generation, so a table computed meanwhile is not stored.
+        self._lock = RLock()
+        self._generation = 0
+        # Weak subscriptions whose handler was collected, to be removed.
+        # The finalizer only appends here; it can run at any allocation, in
+        # any thread, so it must not touch the dicts above.
+        self._dead: deque[tuple[type, weakref.ref]] = deque()
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._batch: ContextVar[EventBatch | None] = ContextVar("batch", default=None)
+        self.instrumentation: Instrumentation | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """The thread pool for handlers, created when first needed."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="EventHub"
+            )
+        return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Release the threads of the hub. It can still be used afterwards."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def subscribe(
+        self,
+        event_cls: type,
+        function: Callable,
+        batch: bool = False,
+        key: Callable[[Any], Any] | None = None,
+        weak: bool = False,
+        priority: int = 0,
+    ) -> Callable:
+        """Subscribe a handler ``function`` to the ``event_cls``.
 
-    def subscribe(self, event_cls: type, function: Callable) -> Callable:
-        """Subscribe a handler ``function`` to the ``event_cls``."""
+        If ``batch`` is True, ``function`` receives a list of events and
+        ``key`` may deduplicate them. See ``batching()``.
+
+        If ``weak`` is True, the hub keeps only a weak reference to
+        ``function``, so it does not keep alive, say, the object that owns
+        a bound method. When that object is collected, the subscription
+        is removed automatically.
+
+        Handlers with a higher ``priority`` run first.
+        """
         assert isinstance(event_cls, type)
         assert callable(function)
-        handlers: list[Callable] = self._events.setdefault(event_cls, [])
-        if function in handlers:
-            raise RuntimeError(f"This function is already subscribed to {event_cls}.")
-        handlers.append(function)
+        assert batch or key is None
+        handler: Callable = function
+        handle: Any  # the key of the subscription
+        if weak:
+
+            def forget(ref: weakref.ref) -> None:
+                self._dead.append((event_cls, handle))
+
+            ref = _weak_ref(function, forget)
+            handle = _key(ref, function)
+            handler = WeakHandler(ref)
+        else:
+            handle = _key(function, function)
+        if batch:
+            handler = BatchHandler(handler, key, self._batch)
+        with self._lock:
+            self._prune()
+            lanes = self._events.setdefault(event_cls, {})
+            if self._find(lanes, function) is not None:
+                raise RuntimeError(
+                    f"This function is already subscribed to {event_cls}."
+                )
+            lanes.setdefault(priority, {})[handle] = handler
+            self._invalidate()
         return function
 
+    def _invalidate(self) -> None:
+        """Forget the dispatch tables, after a change in the subscriptions."""
+        with self._lock:
+            self._generation += 1
+            self._tables = {}
+
+    @staticmethod
+    def _find(lanes: dict[int, dict[Any, Callable]], function: Callable) -> Any:
+        """Return the key under which ``function`` is in ``lanes``."""
+        strong = _key(function, function)
+        try:
+            weak = _key(_weak_ref(function), function)
+        except TypeError:  # this function does not support weak references
+            weak = None
+        for handlers in lanes.values():
+            if strong in handlers:
+                return strong
+            if weak is not None and weak in handlers:
+                return weak
+        return None
+
+    def _remove(self, event_cls: type, handle: Any) -> None:
+        with self._lock:
+            lanes = self._events.get(event_cls)
+            if lanes is None:
+                return
+            for priority, handlers in lanes.items():
+                if handlers.pop(handle, None) is not None:
+                    break
+            else:
+                return
+            if not handlers:
+                del lanes[priority]
+                if not lanes:
+                    del self._events[event_cls]
+            self._invalidate()
+
+    def _prune(self) -> None:
+        """Remove the weak subscriptions whose handler was collected."""
+        with self._lock:
+            while self._dead:
+                self._remove(*self._dead.popleft())
+
     def unsubscribe(self, event_cls: type, function: Callable) -> bool:
         """Remove a function.  Return True if it really was subscribed."""
-        handlers: list[Callable] = self._events.setdefault(event_cls, [])
-        ret = function in handlers
-        if ret:
-            handlers.remove(function)
-        return ret
+        with self._lock:
+            self._prune()
+            handle = self._find(self._events.get(event_cls, {}), function)
+            if handle is None:
+                return False
+            self._remove(event_cls, handle)
+            return True
 
-    def broadcast(self, event) -> None:
+    def instrument(
+        self, enabled: bool = True, window: int = 1000
+    ) -> Instrumentation | None:
+        """Start (or stop) timing the handlers. Return the statistics.
+
+        Enabling it again keeps the statistics gathered so far.
+        """
+        with self._lock:
+            if not enabled:
+                self.instrumentation = None
+            elif self.instrumentation is None:
+                self.instrumentation = Instrumentation(window)
+            self._invalidate()
+        return self.instrumentation
+
+    @contextmanager
+    def batching(self, window: float | None = None) -> Iterator[EventBatch]:
+        """Group the events for batch handlers until the block ends.
+
+        Blocks can be nested; the outermost one delivers the batches.
+        The scope is a context variable, so it covers broadcasts made
+        in the same thread or asyncio task.
+        """
+        batch = self._batch.get()
+        if batch is not None:
+            yield batch
+            return
+        batch = EventBatch(window)
+        token = self._batch.set(batch)
+        try:
+            yield batch
+        finally:
+            self._batch.reset(token)
+            batch.deliver()
+            if batch.awaitables:
+                for awaitable in batch.awaitables:
+                    getattr(awaitable, "close", lambda: None)()
+                raise TypeError(
+                    "Coroutine batch handlers require `async with hub.abatching()`."
+                )
+
+    @asynccontextmanager
+    async def abatching(self, window: float | None = None) -> AsyncIterator[EventBatch]:
+        """Like ``batching()``, but also awaits coroutine batch handlers."""
+        batch = self._batch.get()
+        if batch is not None:
+            yield batch
+            return
+        batch = EventBatch(window)
+        token = self._batch.set(batch)
+        try:
+            yield batch
+        finally:
+            self._batch.reset(token)
+            batch.deliver()
+            await batch.wait()
+
+    def _table(self, event_cls: type) -> _Table:
+        """Return the cached dispatch table of ``event_cls``."""
+        if self._dead:
+            self._prune()
+        table = self._tables.get(event_cls)
+        if table is not None:
+            return table
+        generation = self._generation
+        instrumentation = self.instrumentation
+        # Merge the lanes of the class and of its bases. Iterate over
+        # copies, since another thread may be changing the subscriptions.
+        seen: set[Any] = set()
+        merged: dict[int, list[Callable]] = {}
+        for cls in event_cls.__mro__:
+            for priority, handlers in tuple(self._events.get(cls, {}).items()):
+                lane = merged.setdefault(priority, [])
+                for handle, fn in tuple(handlers.items()):
+                    if handle in seen:
+                        continue
+                    seen.add(handle)
+                    if instrumentation is not None:
+                        fn = instrumentation.wrap(event_cls, handle, fn)
+                    lane.append(fn)
+        lanes = tuple(
+            tuple(merged[priority])
+            for priority in sorted(merged, reverse=True)
+            if merged[priority]
+        )
+        table = (tuple(chain.from_iterable(lanes)), lanes)
+        with self._lock:
+            if generation == self._generation:  # nothing changed meanwhile
+                self._tables[event_cls] = table
+        return table
+
+    def handlers_for(self, event_cls: type) -> tuple[Callable, ...]:
+        """Return the handlers that receive events of ``event_cls``.
+
+        Those are the handlers of the class itself and of its bases,
+        each one only once, by priority; and within the same priority,
+        most specific first.
+        """
+        return self._table(event_cls)[0]
+
+    def lanes_for(self, event_cls: type) -> tuple[tuple[Callable, ...], ...]:
+        """Return the handlers of ``event_cls`` grouped by priority."""
+        return self._table(event_cls)[1]
+
+    def broadcast(self, event) -> bool:
         """Trigger/fire ``event`` -- execute its subscribers.
 
-        The type of ``event`` must be an exact match: inheritance
-        is not supported.
+        Subscribers of the base classes of ``event`` are executed too.
+        Return False if a handler raised ``StopPropagation``.
+        """
+        for fn in self.handlers_for(type(event)):
+            try:
+                fn(event)
+            except StopPropagation:
+                return False
+        return True
+
+    def broadcast_threaded(
+        self, event, timeout: float | None = None, errors: str = "raise"
+    ) -> list[BaseException]:
+        """Fire ``event``, executing its subscribers in the thread pool.
+
+        Return when all handlers have finished or timed out. The
+        ``timeout`` counts from the moment the handlers of a priority lane
+        are submitted, so waiting in the queue counts too; handlers that
+        have not started when it expires are cancelled.
         """
-        handlers: list[Callable] = self._events.setdefault(type(event), [])
-        for fn in handlers:
-            fn(event)
+        assert errors in ERROR_POLICIES
+        exceptions: list[BaseException] = []
+        for lane in self.lanes_for(type(event)):
+            # Each thread runs in a copy of our context, to see batching().
+            futures = [
+                self.executor.submit(copy_context().run, fn, event) for fn in lane
+            ]
+            done, _ = wait(futures, timeout)  # a single deadline for the lane
+            for future in futures:
+                if future in done:
+                    if (exception := future.exception()) is not None:
+                        exceptions.append(exception)
+                else:
+                    future.cancel()
+                    exceptions.append(
+                        TimeoutError(f"Event handler did not finish in {timeout} s.")
+                    )
+            if any(isinstance(e, StopPropagation) for e in exceptions):
+                break
+        return _outcome(exceptions, errors)
+
+    async def abroadcast(
+        self, event, timeout: float | None = None, errors: str = "raise"
+    ) -> list[BaseException]:
+        """Fire ``event``, awaiting its subscribers concurrently.
+
+        Coroutine functions are awaited in the running event loop;
+        other handlers are executed in the thread pool of the hub.
+        """
+        assert errors in ERROR_POLICIES
+        loop = asyncio.get_running_loop()
+
+        async def run(fn: Callable) -> None:
+            stats = None
+            if isinstance(fn, TimedHandler):
+                stats, fn = fn.stats, fn.handler
+            argument: Any = event
+            if isinstance(fn, BatchHandler):
+                batch = fn.scope.get()
+                if batch is not None:
+                    batch.add(fn, event)
+                    return
+                fn, argument = fn.function, [event]
+            function = fn.ref() if isinstance(fn, WeakHandler) else fn
+            if function is None:
+                return
+            failed = True
+            start = perf_counter()
+            try:
+                if iscoroutinefunction(function):
+                    awaitable = function(argument)
+                else:
+                    awaitable = loop.run_in_executor(
+                        self.executor, copy_context().run, function, argument
+                    )
+                await asyncio.wait_for(awaitable, timeout)
+                failed = False
+            finally:
+                if stats is not None:
+                    stats.record(perf_counter() - start, failed)
+
+        exceptions: list[BaseException] = []
+        for lane in self.lanes_for(type(event)):
+            results = await asyncio.gather(
+                *(run(fn) for fn in lane), return_exceptions=True
+            )
+            exceptions.extend(
+                result for result in results if isinstance(result, BaseException)
+            )
+            if any(isinstance(e, StopPropagation) for e in exceptions):
+                break
+        batch = self._batch.get()
+        if batch is not None and batch.awaitables:  # delivered by the window
+            await batch.wait()
+        return _outcome(exceptions, errors)
+
+
+class DeferredEvents:
+    """A per-request queue of events to be broadcast after commit."""
+
+    def __init__(self, hub: EventHub, executor: Executor | None = None) -> None:
+        """``executor`` defaults to the thread pool of the ``hub``."""
+        self.hub = hub
+        self.executor = executor
+        self.pending: list[Any] = []
+
+    def broadcast(self, event) -> None:
+        """Buffer ``event`` until ``flush()`` or ``discard()``."""
+        self.pending.append(event)
+
+    def discard(self, since: int = 0) -> None:
+        """Forget the buffered events, e. g. because of a rollback.
+
+        Pass ``since`` to keep the first events, e. g. when only a
+        savepoint was rolled back.
+        """
+        del self.pending[since:]
+
+    def flush(self) -> Future | None:
+        """Broadcast the buffered events in the background, in order.
+
+        Return the Future of the delivery, or None if there were no events.
+        Exceptions raised by handlers are logged, so one failing handler
+        does not prevent the other events from being delivered.
+        """
+        if not self.pending:
+            return None
+        events, self.pending = self.pending, []
+        return (self.executor or self.hub.executor).submit(self._deliver, events)
+
+    def _deliver(self, events: list[Any]) -> None:
+        for event in events:
+            try:
+                self.hub.broadcast(event)
+            except Exception:
+                logger.exception("A handler failed on deferred event %r", event)
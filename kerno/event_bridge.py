@@ -0,0 +1,268 @@
+"""Deliver events to the EventHub of sibling processes on the same host.
+
+An ``EventHub`` lives in one process, but an application server usually
+runs many worker processes, and some events (e. g. cache invalidation)
+must reach all of them. An ``EventBridge`` subscribes to the event
+classes you choose, serializes the events and forwards them, in batches,
+through a transport to the other processes, whose bridges broadcast them
+in their own hubs. No external broker is needed::
+
+    bridge = EventBridge(kerno.events, [CacheInvalidated], channel="myapp")
+    bridge.start()  # in each worker, e. g. in gunicorn's post_fork hook
+
+Events must be picklable (or you can pass other ``dumps`` and ``loads``
+functions). Events received from other processes are not forwarded again.
+
+Forwarding never makes a request wait for the other processes: events go
+into a bounded in-memory backlog, emptied by a background thread. When
+the backlog is full, ``broadcast()`` blocks for up to ``block_timeout``
+seconds (backpressure) and then the event is dropped and counted in
+``bridge.dropped``.
+
+The default transport, ``UnixSocketTransport``, binds one Unix datagram
+socket per process in a private directory (one per channel) and sends
+each batch to every other socket there. Other transports only need the
+methods of ``Transport``.
+"""
+
+from contextvars import ContextVar
+import errno
+from itertools import count
+import logging
+import os
+import pickle
+from queue import Empty, Full, Queue
+from select import select
+import socket
+import stat
+from tempfile import gettempdir
+from threading import Event, Thread
+from typing import Any, Callable, Iterable, Protocol
+
+from kerno.event import EventHub
+
+logger = logging.getLogger(__name__)
+
+
+class Transport(Protocol):
+    """Carries messages (serialized batches) between local processes."""
+
+    def send(self, message: bytes) -> None:
+        """Send ``message`` to all the other processes.
+
+        Raise OSError if it is too large, so the bridge splits the batch.
+        """
+
+    def receive(self, timeout: float) -> bytes | None:
+        """Return the next message, or None if ``timeout`` elapses first."""
+
+    def close(self) -> None:
+        """Release the resources of the transport."""
+
+
+_sockets = count()
+
+
+def _make_private_directory(path: str) -> None:
+    """Create ``path`` with mode 0o700, or check that it is so.
+
+    ``makedirs()`` does not apply the mode to a directory that already
+    exists -- maybe created by another user in the shared /tmp.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or stat.S_IMODE(info.st_mode) != 0o700
+    ):
+        raise PermissionError(
+            f"{path} must be a directory owned by the current user, mode 0o700."
+        )
+
+
+class UnixSocketTransport:
+    """A transport using a Unix datagram socket for each process.
+
+    Every process binds a socket in ``directory``, which must be private:
+    owned by the current user, with mode 0o700 (it is created so if it
+    does not exist). Otherwise PermissionError is raised, since anyone
+    who can write to the directory could send us pickles.
+
+    ``send()`` writes the message to all the other sockets in the
+    directory, removing those whose process is gone. A message must fit
+    in a single datagram of ``max_size`` bytes.
+    """
+
+    max_size = 64 * 1024
+
+    def __init__(self, directory: str, send_timeout: float = 1.0) -> None:  # noqa
+        _make_private_directory(directory)
+        self.directory = directory
+        self.address = os.path.join(directory, f"{os.getpid()}-{next(_sockets)}.sock")
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.bind(self.address)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # If a peer does not read its messages, do not wait forever.
+        self._sender.settimeout(send_timeout)
+
+    @classmethod
+    def for_channel(cls, channel: str, **kw) -> "UnixSocketTransport":
+        """Return a transport in a temporary directory named after ``channel``."""
+        parent = os.path.join(gettempdir(), f"kerno-events-{os.getuid()}")
+        _make_private_directory(parent)
+        return cls(os.path.join(parent, channel), **kw)
+
+    def peers(self) -> list[str]:
+        """Return the addresses of the sockets of the other processes."""
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".sock")
+            and os.path.join(self.directory, name) != self.address
+        ]
+
+    def send(self, message: bytes) -> None:  # noqa
+        if len(message) > self.max_size:
+            # The kernel might accept it, but receive() would truncate it.
+            raise OSError(errno.EMSGSIZE, "Message too long", len(message))
+        for address in self.peers():
+            try:
+                self._sender.sendto(message, address)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:  # nobody is listening there anymore
+                    os.unlink(address)
+                except FileNotFoundError:
+                    pass
+            except socket.timeout:
+                logger.warning("Event bridge peer %s is not reading.", address)
+
+    def receive(self, timeout: float) -> bytes | None:  # noqa
+        readable, _, _ = select([self._receiver], [], [], timeout)
+        return self._receiver.recv(self.max_size) if readable else None
+
+    def close(self) -> None:  # noqa
+        self._receiver.close()
+        self._sender.close()
+        try:
+            os.unlink(self.address)
+        except FileNotFoundError:
+            pass
+
+
+_remote: ContextVar[bool] = ContextVar("remote", default=False)
+
+
+class EventBridge:
+    """Forwards events of ``event_classes`` between the hubs of processes."""
+
+    def __init__(
+        self,
+        hub: EventHub,
+        event_classes: Iterable[type],
+        channel: str = "default",
+        transport: Transport | None = None,
+        batch_size: int = 100,
+        backlog: int = 10_000,
+        block_timeout: float = 0.1,
+        dumps: Callable[[Any], bytes] = pickle.dumps,
+        loads: Callable[[bytes], Any] = pickle.loads,
+    ) -> None:
+        """Create the bridge; ``transport`` defaults to a Unix socket."""
+        self.hub = hub
+        self.event_classes = tuple(event_classes)
+        self.channel = channel
+        self.transport = transport
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+        self.dumps = dumps
+        self.loads = loads
+        self.backlog: Queue = Queue(maxsize=backlog)
+        self.dropped = 0
+        self._stopping = Event()
+        self._threads: list[Thread] = []
+
+    def start(self) -> "EventBridge":
+        """Subscribe to the event classes and start the background threads.
+
+        Call this in each process, after forking.
+        """
+        if self.transport is None:
+            self.transport = UnixSocketTransport.for_channel(self.channel)
+        self._stopping.clear()
+        for event_cls in self.event_classes:
+            self.hub.subscribe(event_cls, self.forward)
+        self._threads = [
+            Thread(target=loop, name=f"EventBridge-{loop.__name__}", daemon=True)
+            for loop in (self._send_loop, self._receive_loop)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Send what is in the backlog, then stop the bridge."""
+        for event_cls in self.event_classes:
+            self.hub.unsubscribe(event_cls, self.forward)
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        assert self.transport
+        self.transport.close()
+
+    def forward(self, event) -> None:
+        """Put a local ``event`` in the backlog to be sent to other processes."""
+        if _remote.get():  # it came from another process
+            return
+        try:
+            self.backlog.put(event, timeout=self.block_timeout)
+        except Full:
+            self.dropped += 1
+            logger.warning("Event bridge backlog is full; dropped %r", event)
+
+    def _send_loop(self) -> None:
+        while not (self._stopping.is_set() and self.backlog.empty()):
+            try:
+                batch = [self.backlog.get(timeout=0.05)]
+            except Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.backlog.get_nowait())
+                except Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch: list) -> None:
+        """Serialize and send ``batch``, splitting it if it is too large."""
+        assert self.transport
+        try:
+            self.transport.send(self.dumps(batch))
+        except OSError as e:
+            if len(batch) == 1:
+                logger.error("Event bridge could not send %r: %s", batch[0], e)
+                return
+            middle = len(batch) // 2
+            self._send(batch[:middle])
+            self._send(batch[middle:])
+        except Exception:
+            logger.exception("Event bridge could not send a batch.")
+
+    def _receive_loop(self) -> None:
+        assert self.transport
+        _remote.set(True)  # this thread only broadcasts events from elsewhere
+        while not self._stopping.is_set():
+            message = self.transport.receive(timeout=0.05)
+            if message is None:
+                continue
+            try:
+                events = self.loads(message)
+            except Exception:
+                logger.exception("Event bridge could not decode a message.")
+                continue
+            for event in events:
+                try:
+                    self.hub.broadcast(event)
+                except Exception:
+                    logger.exception("A handler failed on remote event %r", event)
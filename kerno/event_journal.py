@@ -0,0 +1,179 @@
+"""A durable journal of events, which can be replayed through an EventHub.
+
+Events that were broadcast but not yet handled are lost when a process
+crashes, and rebuilding derived state (caches, search indexes) would
+mean running whole actions again. An ``EventJournal`` appends the
+events of selected classes to a local SQLite database::
+
+    journal = EventJournal(kerno.events, [OrderPlaced], "events.sqlite3")
+    journal.start()
+
+Writes happen in a background thread with group commit: all the events
+that arrive while a transaction is being committed go together in the
+next transaction, so journaling does not add a disk sync to the latency
+of each request. ``flush()`` waits until everything is on disk.
+
+Later -- for catch-up after a crash, or to warm a cache -- the journaled
+events can be fed back through a hub, in the order they were recorded::
+
+    last = journal.replay(since=checkpoint)
+
+Events are pickled by default; pass other ``dumps`` and ``loads``
+functions to change that. Replayed events are not journaled again.
+
+The journal subscribes at the highest priority, so an event is recorded
+before any other handler runs -- even if one of them raises.
+"""
+
+from contextvars import ContextVar
+import logging
+import pickle
+import sys
+from queue import Empty, Queue
+import sqlite3
+from threading import Event, Thread
+from time import time
+from typing import Any, Callable, Iterable, Iterator
+
+from kerno.event import EventHub
+
+logger = logging.getLogger(__name__)
+
+_replaying: ContextVar[bool] = ContextVar("replaying", default=False)
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    event_class TEXT NOT NULL,
+    payload BLOB NOT NULL
+)"""
+
+
+class EventJournal:
+    """Append-only journal of the events of ``event_classes``."""
+
+    priority = sys.maxsize  # record events before any handler runs
+
+    def __init__(
+        self,
+        hub: EventHub,
+        event_classes: Iterable[type],
+        path: str,
+        batch_size: int = 500,
+        dumps: Callable[[Any], bytes] = pickle.dumps,
+        loads: Callable[[bytes], Any] = pickle.loads,
+    ) -> None:
+        """``batch_size`` is the maximum number of events per transaction."""
+        self.hub = hub
+        self.event_classes = tuple(event_classes)
+        self.path = path
+        self.batch_size = batch_size
+        self.dumps = dumps
+        self.loads = loads
+        self.queue: Queue = Queue()
+        self._stopping = Event()
+        self._writer: Thread | None = None
+        self.checkpoint = 0  # sequence number of the last replayed event
+        with self._connect() as connection:
+            connection.execute(SCHEMA)
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        return connection
+
+    def start(self) -> "EventJournal":
+        """Subscribe to the event classes and start the writer thread."""
+        self._stopping.clear()
+        self._writer = Thread(target=self._write_loop, name="EventJournal", daemon=True)
+        self._writer.start()
+        for event_cls in self.event_classes:
+            self.hub.subscribe(event_cls, self.record, priority=self.priority)
+        return self
+
+    def stop(self) -> None:
+        """Write the pending events, then stop journaling."""
+        for event_cls in self.event_classes:
+            self.hub.unsubscribe(event_cls, self.record)
+        self._stopping.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def record(self, event) -> None:
+        """Enqueue ``event`` to be written by the background thread."""
+        if _replaying.get():
+            return
+        cls = type(event)
+        self.queue.put(
+            (time(), f"{cls.__module__}.{cls.__qualname__}", self.dumps(event))
+        )
+
+    def flush(self) -> None:
+        """Block until all the recorded events have been committed."""
+        self.queue.join()
+
+    def _write_loop(self) -> None:
+        connection = self._connect()
+        try:
+            while not (self._stopping.is_set() and self.queue.empty()):
+                try:
+                    batch = [self.queue.get(timeout=0.05)]
+                except Empty:
+                    continue
+                # Group commit: take everything that arrived meanwhile
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except Empty:
+                        break
+                try:
+                    with connection:  # one transaction, thus one disk sync
+                        connection.executemany(
+                            "INSERT INTO events (created, event_class, payload) "
+                            "VALUES (?, ?, ?)",
+                            batch,
+                        )
+                except sqlite3.Error:
+                    logger.exception("Could not journal %d events.", len(batch))
+                for _ in batch:
+                    self.queue.task_done()
+        finally:
+            connection.close()
+
+    def read(self, since: int = 0) -> Iterator[tuple[int, Any]]:
+        """Yield ``(sequence_number, event)`` recorded after ``since``."""
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                "SELECT seq, payload FROM events WHERE seq > ? ORDER BY seq",
+                (since,),
+            )
+            for seq, payload in cursor:
+                yield seq, self.loads(payload)
+        finally:
+            connection.close()
+
+    def replay(self, since: int = 0, hub: EventHub | None = None) -> int:
+        """Broadcast the events recorded after ``since``, in order.
+
+        The events go through ``hub`` (by default, the journaled hub).
+        Return the sequence number of the last event, which can be
+        stored as a checkpoint and passed as ``since`` next time.
+
+        If a handler raises, the exception propagates and
+        ``self.checkpoint`` is the sequence number of the last event that
+        was delivered, so the replay can be resumed after it.
+        """
+        hub = hub or self.hub
+        self.checkpoint = since
+        token = _replaying.set(True)
+        try:
+            for seq, event in self.read(since):
+                hub.broadcast(event)
+                self.checkpoint = seq
+        finally:
+            _replaying.reset(token)
+        return self.checkpoint
@@ -2,9 +2,11 @@
 
 from dataclasses import dataclass, InitVar
 from typing import Any, ClassVar, Generic, Iterable, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
 
 from kerno.protocols import IKerno
 from kerno.bases import Kerno
+from kerno.event import DeferredEvents
 from kerno.typing import DictStr, Entity
 
 
@@ -37,6 +39,7 @@ class BaseSQLAlchemyRepository:
     """Base class for a SQLAlchemy-based repository."""
 
     SAS: ClassVar[str] = "session factory"
+    DEFERRED_EVENTS: ClassVar[str] = "kerno deferred events"
     kerno: IKerno
     session_factory: InitVar[Any] = None
 
@@ -61,6 +64,51 @@ class BaseSQLAlchemyRepository:
         else:
             return session_factory
 
+    @property
+    def events(self) -> DeferredEvents:
+        """Queue of events to be broadcast when the session commits.
+
+        Created on first use, it delivers events to the ``kerno.events``
+        hub in a background thread after each commit, and discards them
+        if the transaction is rolled back. The queue is kept in the
+        ``info`` of the SQLAlchemy session, so a session that outlives
+        the request (e. g. a scoped one) is only watched once.
+        """
+        # A scoped session is a proxy; use the session of this request.
+        registry = getattr(self.sas, "registry", None)
+        session = registry() if registry else self.sas
+        deferred = session.info.get(self.DEFERRED_EVENTS)
+        if deferred is None:
+            deferred = DeferredEvents(self.kerno.events)  # type: ignore[attr-defined]
+            session.info[self.DEFERRED_EVENTS] = deferred
+            self._watch_transaction(session, deferred)
+        return deferred
+
+    def _watch_transaction(self, session: Any, deferred: DeferredEvents) -> None:
+        """Flush ``deferred`` after commit and discard it after rollback.
+
+        Rolling back a SAVEPOINT only discards the events buffered since
+        it began; the rest still belong to the outer transaction.
+        """
+        from sqlalchemy import event
+
+        # Position of the queue when each savepoint began
+        savepoints: WeakKeyDictionary[Any, int] = WeakKeyDictionary()
+
+        def begin(session: Any, transaction: Any) -> None:
+            if transaction.nested:
+                savepoints[transaction] = len(deferred.pending)
+
+        def rollback(session: Any, transaction: Any) -> None:
+            if transaction.nested:
+                deferred.discard(since=savepoints.get(transaction, 0))
+            elif transaction.parent is None:  # the outermost transaction
+                deferred.discard()
+
+        event.listen(session, "after_transaction_create", begin)
+        event.listen(session, "after_commit", lambda session: deferred.flush())
+        event.listen(session, "after_soft_rollback", rollback)
+
     def add(self, entity: Entity) -> Entity:
         """Add an object to the SQLAlchemy session, then return it."""
         self.sas.add(entity)
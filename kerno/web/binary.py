@@ -0,0 +1,150 @@
+"""Binary wire formats for jsonright output.
+
+Between internal services there is no need for JSON text. Here the output
+of ``jsonright()`` can be encoded by a pluggable binary serializer
+backend, keyed by the content type it produces.
+
+In native mode (``jsonright(..., native=True)``) dates, datetimes,
+Decimals and bytes are kept as they are, instead of becoming isoformat
+strings, floats and decoded text, so they travel with their real types.
+
+We ship a CBOR (RFC 8949) backend under ``application/cbor``. If the
+``cbor2`` library is installed it gets used; otherwise our pure-Python
+encoder ``cbor_dumps()`` does the job, so no extra dependency is needed.
+These types are carried natively:
+
+- bytes: byte strings
+- datetime: tag 0, an RFC 3339 string (naive datetimes are taken as UTC)
+- date: tag 1004, an RFC 8943 full-date string
+- Decimal: tag 4, a decimal fraction
+
+You can register other backends, e. g. MessagePack::
+
+    import msgpack
+    from kerno.web.binary import register_backend
+
+    register_backend("application/msgpack", msgpack.packb)
+"""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from struct import pack
+from typing import Any, Callable
+
+from kerno.protocols import IUserlessPeto
+from kerno.web.jsonright import jsonright
+
+backends: dict[str, Callable[[Any], bytes]] = {}
+
+
+def register_backend(content_type: str, dumps: Callable[[Any], bytes]) -> None:
+    """Make ``dumps`` the encoder of ``content_type``."""
+    backends[content_type] = dumps
+
+
+def _head(major: int, value: int) -> bytes:
+    """Return the initial bytes of a CBOR data item."""
+    major <<= 5
+    if value < 24:
+        return bytes((major | value,))
+    elif value < 0x100:
+        return bytes((major | 24, value))
+    elif value < 0x10000:
+        return pack(">BH", major | 25, value)
+    elif value < 0x100000000:
+        return pack(">BI", major | 26, value)
+    else:
+        return pack(">BQ", major | 27, value)
+
+
+def _int(value: int) -> bytes:
+    if value >= 0:
+        major = 0
+    else:
+        major = 1
+        value = -1 - value
+    if value < 0x10000000000000000:
+        return _head(major, value)
+    # Too big for 64 bits: tag 2 or 3 followed by a bignum byte string
+    payload = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return _head(6, 2 + major) + _head(2, len(payload)) + payload
+
+
+def _encode(obj: Any, out: bytearray) -> None:
+    cls = type(obj)
+    if cls is str:
+        utf8 = obj.encode("utf-8")
+        out += _head(3, len(utf8))
+        out += utf8
+    elif obj is None:
+        out.append(0xF6)
+    elif cls is bool:
+        out.append(0xF5 if obj else 0xF4)
+    elif isinstance(obj, int):
+        out += _int(obj)
+    elif isinstance(obj, float):
+        out.append(0xFB)
+        out += pack(">d", obj)
+    elif isinstance(obj, (list, tuple)):
+        out += _head(4, len(obj))
+        for item in obj:
+            _encode(item, out)
+    elif isinstance(obj, dict):
+        out += _head(5, len(obj))
+        for key, value in obj.items():
+            _encode(key, out)
+            _encode(value, out)
+    elif isinstance(obj, (bytes, bytearray)):
+        out += _head(2, len(obj))
+        out += obj
+    elif isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        out += _head(6, 0)
+        _encode(obj.isoformat().replace("+00:00", "Z"), out)
+    elif isinstance(obj, date):
+        out += _head(6, 1004)
+        _encode(obj.isoformat(), out)
+    elif isinstance(obj, Decimal):
+        if not obj.is_finite():
+            _encode(float(obj), out)
+            return
+        sign, digits, exponent = obj.as_tuple()
+        mantissa = int("".join(map(str, digits)))
+        out += _head(6, 4)
+        out += _head(4, 2)
+        out += _int(exponent)  # type: ignore[arg-type]
+        out += _int(-mantissa if sign else mantissa)
+    elif isinstance(obj, (set, frozenset)):
+        _encode(list(obj), out)
+    else:
+        raise TypeError(f"Cannot encode {cls} as CBOR.")
+
+
+def cbor_dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as CBOR. A pure-Python implementation."""
+    out = bytearray()
+    _encode(obj, out)
+    return bytes(out)
+
+
+try:
+    import cbor2  # type: ignore[import]
+except ImportError:
+    register_backend("application/cbor", cbor_dumps)
+else:
+    register_backend(
+        "application/cbor",
+        lambda obj: cbor2.dumps(obj, timezone=timezone.utc, date_as_datetime=False),
+    )
+
+
+def jsonright_binary(
+    obj: Any,
+    peto: IUserlessPeto,
+    features=(),
+    content_type: str = "application/cbor",
+    **kw,
+) -> bytes:
+    """Run ``jsonright()`` in native mode and encode the result."""
+    return backends[content_type](jsonright(obj, peto, features, native=True, **kw))
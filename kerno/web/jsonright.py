@@ -43,6 +43,72 @@ in JSON. It pivots the table so it grows to the right::
 Of course objects are easily reassembled in Javascript.  The function that
 does that is in the file kerno.js.
 
+For very large sequences, ``jsonright_stream()`` yields the same output as
+JSON bytes, incrementally, with bounded memory use.
+
+Very long sequences can be pivoted in parallel by passing a
+``concurrent.futures`` executor: ``jsonright(rows, peto, executor=pool)``.
+See ``pivot_parallel()``.
+
+Blocks
+------
+
+The pivoted format needs all the values of a column before the next column
+can begin, so the whole sequence must be read first. When you pass a
+``block_size``, jsonright instead outputs blocks of that many rows,
+each block pivoted as above, inside an envelope that carries the
+version of the format::
+
+    {"jsonright": 2, "blocks": [
+    [["id", 1, 2], ["email", "ex@am.pl", "sagan@nasa.gov"]]
+    ,[["id", 3], ["email", "ada@love.uk"]]
+    ]}
+
+``jsonright_stream()`` writes each block on its own line as soon as it
+is ready, so kerno.js can render the rows progressively, while the
+response as a whole remains valid JSON.
+
+Dictionary encoding
+-------------------
+
+Columns such as ``status`` or ``country`` repeat a few strings many
+times. Pass ``dictionary=255`` (the maximum number of distinct values)
+and, in each block, such columns are sent as a list of their distinct
+values followed by small integer codes::
+
+    [["status", ["active", "blocked"]], 0, 0, 1, 0]
+
+This option implies the blocks envelope. kerno.js expands the codes.
+
+Heterogeneous sequences
+-----------------------
+
+Normally all entities in a sequence must have the same fields. With
+``union=True`` the columns are the union of all fields; a missing cell
+contains a sentinel declared in the column header, and kerno.js leaves
+that key out of the rebuilt object. Optionally ``type_tag="__type__"``
+adds a column with the class name of each entity::
+
+    [["id", 1, 2], [{"key": "email", "absent": 0}, "ex@am.pl", 0]]
+
+This option also implies the blocks envelope. See ``pivot_union()``.
+
+Nested tables
+-------------
+
+When the jsonright() implementation of an entity includes a list of
+child entities (e. g. orders with their line items), each child list is
+pivoted too, repeating its headers in every parent row. With
+``nested=True`` the headers of child tables are hoisted to the envelope
+once and referenced by index. See ``SchemaIndex``.
+
+Deltas
+------
+
+UIs that poll a list endpoint can receive only what changed since the
+version they already have: ``jsonright(rows, peto, snapshots=cache,
+since=version)``. See ``jsonright_delta()``.
+
 Usage
 =====
 
@@ -50,19 +116,50 @@ Please see a usage example in
 `our tests <https://github.com/nandoflorestan/kerno/blob/master/tests/test_web_jsonright.py>`_.
 """
 
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import fields, is_dataclass
 from datetime import date, datetime
 from decimal import Decimal
-from functools import singledispatch
-from typing import Any, Iterable, Sequence
+from functools import singledispatch, wraps
+from hashlib import blake2b
+from itertools import chain, count, islice
+from json import dumps
+from operator import attrgetter, itemgetter
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+from typing import Any, Callable, Iterable, Iterator, Sequence
 
 from bag import first
 
 from kerno.protocols import IUserlessPeto
 from kerno.typing import DictStr
 
+FORMAT_VERSION = 2  # of the envelope format. Keep in sync with kerno.js.
+
+
+def _slot_names(cls: type) -> list[str]:
+    """Return the names declared in ``__slots__`` throughout the MRO."""
+    names: list[str] = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name not in ("__dict__", "__weakref__") and name not in names:
+                names.append(name)
+    return names
+
 
 def keys_from(obj: Any) -> Iterable[str]:
-    """Return the names of the instance variables of ``obj``."""
+    """Return the names of the instance variables of ``obj``.
+
+    Works for instances with ``__slots__``, with a ``__dict__``, or both.
+    Slots that have not been assigned on ``obj`` are left out.
+    """
+    slots = [name for name in _slot_names(type(obj)) if hasattr(obj, name)]
+    if not hasattr(obj, "__dict__"):
+        return slots
+    if slots:
+        return [*slots, *vars(obj)]
     return vars(obj).keys()
 
 
@@ -81,14 +178,155 @@ def excluding(blacklist: Sequence[str], keys: Iterable[str]) -> Iterable[str]:
     return filter(lambda k: k not in blacklist, keys)
 
 
+def class_var_names(cls: type) -> tuple[str, ...] | None:
+    """Return the attribute names common to all instances of ``cls``.
+
+    This is known for dataclasses. For other classes, return None: their
+    instance variables can vary from one instance to another. That
+    includes classes with ``__slots__`` (which may be left unset) and
+    SQLAlchemy models -- even ``MappedAsDataclass`` ones -- whose
+    ``__dict__`` only contains the attributes that have been loaded;
+    reading any other one could emit a query or raise
+    DetachedInstanceError.
+    """
+    if is_dataclass(cls) and not hasattr(cls, "__mapper__"):
+        return tuple(field.name for field in fields(cls))
+    return None
+
+
+class VarNamesCache:
+    """Memoizes the relevant attribute names of objects, per class.
+
+    When the names are a property of the class (see ``class_var_names()``)
+    they are computed only once for it. Otherwise the filtering result is
+    cached per class and set of instance variables.
+
+    If you change a class at runtime, call ``forget()``.
+    """
+
+    def __init__(self) -> None:  # noqa
+        self._per_class: dict[type, tuple[str, ...] | None] = {}
+        self._per_keys: dict[tuple, tuple[str, ...]] = {}
+
+    @staticmethod
+    def _sane(keys: Iterable[str]) -> tuple[str, ...]:
+        return tuple(excluding(("password",), only_relevant(keys)))
+
+    def get(self, obj: Any) -> tuple[str, ...]:
+        """Return the relevant instance variable names of ``obj``."""
+        cls = type(obj)
+        try:
+            names = self._per_class[cls]
+        except KeyError:
+            class_names = class_var_names(cls)
+            names = self._per_class[cls] = (
+                None if class_names is None else self._sane(class_names)
+            )
+        if names is not None:
+            return names
+        raw = tuple(keys_from(obj))
+        signature = (cls, raw)
+        names = self._per_keys.get(signature)
+        if names is None:
+            names = self._per_keys[signature] = self._sane(raw)
+        return names
+
+    def forget(self, cls: type | None = None) -> None:
+        """Invalidate the cached names of ``cls``, or of all classes."""
+        if cls is None:
+            self._per_class.clear()
+            self._per_keys.clear()
+            return
+        self._per_class.pop(cls, None)
+        for signature in [sig for sig in self._per_keys if sig[0] is cls]:
+            del self._per_keys[signature]
+
+
+var_names = VarNamesCache()
+
+
 def get_sane_var_names(obj: Any) -> Iterable[str]:
-    """Return instance variable names, excluding probably irrelevant ones."""
-    return excluding(("password",), only_relevant(keys_from(obj)))
+    """Return instance variable names, excluding probably irrelevant ones.
+
+    The result is memoized per class by ``var_names``, a VarNamesCache.
+    """
+    return var_names.get(obj)
+
+
+def _compile_encoder(
+    keys: tuple[str, ...], native: bool = False
+) -> Callable[[Any], DictStr]:
+    """Return a function that dumps the attributes ``keys`` of an object."""
+    if not keys:
+        return lambda obj: {}
+    getter = attrgetter(*keys)
+    if native:  # no conversion of dates
+        if len(keys) == 1:
+            return lambda obj: {keys[0]: getter(obj)}
+        return lambda obj: dict(zip(keys, getter(obj)))
+    if len(keys) == 1:  # attrgetter returns a scalar, not a tuple, in this case
+        key = keys[0]
+
+        def encode_one(obj: Any) -> DictStr:
+            value = getter(obj)
+            return {key: value.isoformat() if isinstance(value, date) else value}
+
+        return encode_one
+
+    def encode(obj: Any) -> DictStr:
+        return {
+            key: value.isoformat() if isinstance(value, date) else value
+            for key, value in zip(keys, getter(obj))
+        }
+
+    return encode
+
+
+class EncoderRegistry:
+    """Cache of compiled entity encoders used by ``entity2dict()``.
+
+    One specialized function is built per combination of class, key list
+    and native types, then reused for all later instances.
+
+    For debugging, turn the cache off with
+    ``kerno.web.jsonright.encoders.enabled = False``.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:  # noqa
+        self.enabled = enabled
+        self._encoders: dict[tuple, Callable[[Any], DictStr]] = {}
+
+    def get(
+        self,
+        cls: type,
+        keys: tuple[str, ...],
+        native: bool = False,
+    ) -> Callable[[Any], DictStr]:
+        """Return the encoder for ``cls`` and ``keys``, compiling it if needed.
+
+        If ``native`` is True, dates are not converted to strings.
+        """
+        signature = (cls, keys, native)
+        encoder = self._encoders.get(signature)
+        if encoder is None:
+            encoder = self._encoders[signature] = _compile_encoder(keys, native)
+        return encoder
+
+    def clear(self) -> None:
+        """Throw away all compiled encoders."""
+        self._encoders.clear()
+
+    def __len__(self) -> int:
+        return len(self._encoders)
+
+
+encoders = EncoderRegistry()
 
 
 def entity2dict(
     obj: Any,
     keys: Iterable[str] = (),
+    native: bool = False,
 ) -> DictStr:
     """Dump certain instance variables of ``obj`` into a dictionary.
 
@@ -97,13 +335,25 @@ def entity2dict(
     If you do not provide any ``keys``, a sensible default is used.
 
     If a value is a date or datetime, it gets converted to a str,
-    so the returned dictionary can be converted to JSON.
+    so the returned dictionary can be converted to JSON -- unless ``native``
+    is True, which is meant for binary formats (see kerno.web.binary).
+    Your jsonright() implementations can pass along
+    ``native=kw.get("native", False)``.
+
+    Unless ``encoders.enabled`` is False, the work is done by a compiled
+    encoder which is cached for the class of ``obj``.
     """
+    if encoders.enabled:
+        names = tuple(keys) if keys else var_names.get(obj)
+        return encoders.get(type(obj), names, native=native)(obj)
     kk = keys or get_sane_var_names(obj=obj)
     adict = {}
     for key in kk:
         value = getattr(obj, key)
-        adict[key] = value.isoformat() if isinstance(value, (date, datetime)) else value
+        if native or not isinstance(value, (date, datetime)):
+            adict[key] = value
+        else:
+            adict[key] = value.isoformat()
     return adict
 
 
@@ -119,6 +369,87 @@ def jsonright(obj: Any, peto: IUserlessPeto, features=(), **kw) -> Any:
     )
 
 
+class JsonrightMemo:
+    """Request-scoped memo table for jsonright() results.
+
+    Within one request the same entity is often encoded many times, e. g.
+    a user who is the author of many comments. Attach a memo to the peto,
+    which lives as long as the request::
+
+        JsonrightMemo.attach(peto)
+
+    ...and decorate the expensive implementations with ``memoized``.
+    Then each object is encoded only once per combination of features
+    and keyword arguments; later encodes are served from the memo.
+
+    The memo keeps a reference to each object, so its ``id()`` cannot
+    be reused by another object while the memo lives. Memoized results
+    are shared, therefore they must not be mutated by callers.
+    """
+
+    ATTRIBUTE = "jsonright_memo"
+
+    def __init__(self) -> None:  # noqa
+        self._table: dict[tuple, tuple[Any, Any]] = {}
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    @classmethod
+    def attach(cls, peto: Any) -> "JsonrightMemo":
+        """Create a memo and store it in ``peto``."""
+        memo = cls()
+        setattr(peto, cls.ATTRIBUTE, memo)
+        return memo
+
+    def stats(self) -> DictStr:
+        """Return hit and miss counts, in total and per type name."""
+        return {
+            "hits": self.hits.total(),
+            "misses": self.misses.total(),
+            "size": len(self._table),
+            "by_type": {
+                name: {"hits": self.hits[name], "misses": self.misses[name]}
+                for name in self.misses
+            },
+        }
+
+
+def _freeze(features) -> Any:
+    """Return a hashable version of the ``features`` argument."""
+    if isinstance(features, (set, frozenset)):
+        return frozenset(features)
+    return tuple(features)
+
+
+def memoized(fn: Callable) -> Callable:
+    """Decorate a jsonright() implementation so it uses the JsonrightMemo.
+
+    Without a memo in the peto, the implementation is simply called.
+    """
+
+    @wraps(fn)
+    def wrapper(obj, peto: IUserlessPeto, features=(), **kw):
+        memo = getattr(peto, JsonrightMemo.ATTRIBUTE, None)
+        if memo is None:
+            return fn(obj, peto, features, **kw)
+        try:
+            key = (id(obj), _freeze(features), frozenset(kw.items()))
+            hash(key)
+        except TypeError:  # unhashable features or keyword arguments
+            return fn(obj, peto, features, **kw)
+        type_name = type(obj).__qualname__
+        found = memo._table.get(key)
+        if found is not None:
+            memo.hits[type_name] += 1
+            return found[1]
+        memo.misses[type_name] += 1
+        result = fn(obj, peto, features, **kw)
+        memo._table[key] = (obj, result)
+        return result
+
+    return wrapper
+
+
 @jsonright.register(str)
 @jsonright.register(int)
 @jsonright.register(float)
@@ -130,17 +461,23 @@ def _a(obj, peto: IUserlessPeto, features=(), **kw) -> Any:
 
 @jsonright.register(bytes)
 def _b(obj, peto: IUserlessPeto, features=(), **kw) -> Any:
+    if kw.get("native"):
+        return obj
     return obj.decode(kw.get("encoding", "utf-8"))
 
 
 @jsonright.register(Decimal)
-def _c(obj, peto: IUserlessPeto, features=(), **kw) -> float:
+def _c(obj, peto: IUserlessPeto, features=(), **kw) -> float | Decimal:
+    if kw.get("native"):
+        return obj
     return float(str(obj))
 
 
 @jsonright.register(datetime)
 @jsonright.register(date)
-def _d(obj, peto: IUserlessPeto, features=(), **kw) -> str:
+def _d(obj, peto: IUserlessPeto, features=(), **kw) -> str | date:
+    if kw.get("native"):
+        return obj
     return obj.isoformat()
 
 
@@ -165,29 +502,658 @@ primitive_types = (
 )
 
 
+# Values of these exact types need no conversion; dispatch is skipped for them.
+json_scalar_types = frozenset((str, int, float, bool, type(None)))
+
+_schemas: dict[tuple[str, ...], Callable[[DictStr], tuple]] = {}
+
+
+def schema_getter(keys: tuple[str, ...]) -> Callable[[DictStr], tuple]:
+    """Return a cached function that reads ``keys``, in order, from a dict."""
+    getter = _schemas.get(keys)
+    if getter is None:
+        if len(keys) == 1:
+            key = keys[0]
+            getter = lambda adict: (adict[key],)  # noqa: E731
+        elif keys:
+            getter = itemgetter(*keys)
+        else:
+            getter = lambda adict: ()  # noqa: E731
+        _schemas[keys] = getter
+    return getter
+
+
+def pivot(
+    entities: Iterable[Any], peto: IUserlessPeto, features=(), **kw
+) -> list[list]:
+    """Encode each of ``entities`` exactly once and pivot them into columns.
+
+    The column order (the schema) comes from the first entity. Values that
+    already are JSON scalars are copied without going through dispatch.
+    """
+    columns: list[list] = []
+    getter = None
+    for entity in entities:
+        adict = jsonright(entity, peto, features, **kw)
+        if getter is None:
+            keys = tuple(adict)
+            getter = schema_getter(keys)
+            columns = [[key] for key in keys]
+        try:
+            values = getter(adict)
+        except KeyError as e:
+            raise RuntimeError(
+                "jsonright cannot pivot sequences containing "
+                "objects of different types if their fields differ. "
+                "Use union=True."
+            ) from e
+        for column, value in zip(columns, values):
+            column.append(
+                value
+                if type(value) in json_scalar_types
+                else jsonright(value, peto, features, **kw)
+            )
+    return columns
+
+
+def row_fields(obj: Any) -> tuple[str, ...] | None:
+    """Return the field names of a named-tuple-like row, else None.
+
+    Named tuples and SQLAlchemy ``Row`` objects (the results of
+    column-only queries) carry their field names in ``_fields``.
+    """
+    if isinstance(obj, (str, bytes, dict)):
+        return None
+    return getattr(obj, "_fields", None)
+
+
+def row2dict(row: Any, peto: IUserlessPeto, features=(), **kw) -> DictStr:
+    """Encode a named-tuple-like row as a dict keyed by its ``_fields``."""
+    return {
+        key: (
+            value
+            if type(value) in json_scalar_types
+            else jsonright(value, peto, features, **kw)
+        )
+        for key, value in zip(row._fields, row)
+    }
+
+
+def pivot_rows(
+    rows: Sequence[Any], peto: IUserlessPeto, features=(), **kw
+) -> list[list]:
+    """Pivot named-tuple-like rows directly from their tuples.
+
+    This is the fast path for the results of column-only queries:
+    the headers are read from ``_fields`` of the first row only, and
+    the rows are transposed without creating a dict per row. Thus all
+    rows must have the same fields, as they do in the result of a query.
+    Values that are not JSON scalars still go through ``jsonright()``.
+    """
+    columns = [[key] for key in first(rows)._fields]
+
+    def convert(value):
+        if type(value) in json_scalar_types:
+            return value
+        return jsonright(value, peto, features, **kw)
+
+    for column, values in zip(columns, zip(*rows)):
+        if json_scalar_types.issuperset(map(type, values)):
+            column.extend(values)
+        else:
+            column.extend(map(convert, values))
+    return columns
+
+
+def dictionary_encode(columns: list[list], max_distinct: int) -> list[list]:
+    """Replace repetitive text columns of a pivoted table with codes.
+
+    A column qualifies if all its values are strings (or None), with at
+    most ``max_distinct`` distinct values, each of which appears twice on
+    average. Its header then becomes ``[key, distinct_values]`` and each
+    cell becomes the index of its value in ``distinct_values``.
+    """
+    for index, column in enumerate(columns):
+        rows = len(column) - 1
+        codes: dict[str | None, int] = {}
+        for value in islice(column, 1, None):
+            if type(value) is not str and value is not None:
+                break
+            if value not in codes:
+                if len(codes) == max_distinct:
+                    break
+                codes[value] = len(codes)
+        else:
+            if len(codes) * 2 <= rows:
+                encoded: list[Any] = [[column[0], list(codes)]]
+                encoded.extend(codes[value] for value in islice(column, 1, None))
+                columns[index] = encoded
+    return columns
+
+
+_ABSENT = object()  # marks missing cells while building a union schema
+
+
+def pivot_union(
+    entities: Iterable[Any],
+    peto: IUserlessPeto,
+    features=(),
+    type_tag: str = "",
+    **kw,
+) -> list[list]:
+    """Pivot ``entities`` whose fields differ, in a single pass.
+
+    The columns are the union of the keys of all the encoded entities,
+    in order of first appearance. In a column where some rows lack the
+    key, the missing cells contain a sentinel: the smallest non-negative
+    integer that is not a value of that column, so it is compact and can
+    never be mistaken for a value. The header of such a column is then
+    ``{"key": key, "absent": sentinel}``.
+
+    If ``type_tag`` is given, a column with that name is added,
+    containing the class name of each entity.
+    """
+    columns: dict[str, list] = {}
+    tags: list[str] = []
+    rows = 0
+    for entity in entities:
+        adict = jsonright(entity, peto, features, **kw)
+        for key, value in adict.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [_ABSENT] * rows
+            column.append(
+                value
+                if type(value) in json_scalar_types
+                else jsonright(value, peto, features, **kw)
+            )
+        rows += 1
+        if len(adict) < len(columns):
+            for column in columns.values():
+                if len(column) < rows:
+                    column.append(_ABSENT)
+        if type_tag:
+            tags.append(type(entity).__name__)
+
+    ret: list[list] = []
+    for key, column in columns.items():
+        if not any(value is _ABSENT for value in column):
+            column.insert(0, key)
+            ret.append(column)
+            continue
+        used = {value for value in column if type(value) in (int, float)}
+        sentinel = next(number for number in count() if number not in used)
+        ret.append(
+            [
+                {"key": key, "absent": sentinel},
+                *(sentinel if value is _ABSENT else value for value in column),
+            ]
+        )
+    if type_tag:
+        ret.append([type_tag, *tags])
+    return ret
+
+
+def iter_blocks(
+    entities: Iterable[Any],
+    peto: IUserlessPeto,
+    features=(),
+    block_size: int = 1000,
+    dictionary: int = 0,
+    union: bool = False,
+    type_tag: str = "",
+    **kw,
+) -> Iterator[list[list]]:
+    """Pivot ``entities`` in blocks of ``block_size`` rows.
+
+    Only one block is held in memory at a time. If ``dictionary`` is
+    given, each block goes through ``dictionary_encode()`` with it
+    as ``max_distinct``. If ``union`` is True, blocks are pivoted by
+    ``pivot_union()``, which receives ``type_tag``.
+    """
+
+    def pivot_block(block: list) -> list[list]:
+        if union:
+            columns = pivot_union(block, peto, features, type_tag, **kw)
+        elif row_fields(block[0]) is not None:
+            columns = pivot_rows(block, peto, features, **kw)
+        else:
+            columns = pivot(block, peto, features, **kw)
+        return dictionary_encode(columns, dictionary) if dictionary else columns
+
+    block: list = []
+    for entity in entities:
+        block.append(entity)
+        if len(block) >= block_size:
+            yield pivot_block(block)
+            block = []
+    if block:
+        yield pivot_block(block)
+
+
+def _pivot_chunk(chunk: list, peto: Any, features, kw: DictStr) -> list[list]:
+    """Pivot one chunk of rows in a worker. Must be picklable, thus global."""
+    return pivot(chunk, peto, features, **kw)
+
+
+def pivot_parallel(
+    entities: Sequence[Any],
+    peto: IUserlessPeto,
+    features=(),
+    executor: Executor | None = None,
+    chunk_size: int = 10_000,
+    min_rows: int = 50_000,
+    worker_peto: Any = None,
+    **kw,
+) -> list[list]:
+    """Like ``pivot()``, but encode chunks of rows in an ``executor``.
+
+    Parallelism only pays off for long sequences, so below ``min_rows``
+    rows (or without an ``executor``) this simply calls ``pivot()``.
+    Otherwise the sequence is split into chunks of ``chunk_size`` rows,
+    which are pivoted by the executor; the resulting columns are then
+    stitched together in the original order.
+
+    A ThreadPoolExecutor shares memory, so it receives the ``peto``.
+    Any other executor, such as a ProcessPoolExecutor, pickles what it
+    receives, so workers get ``worker_peto`` instead (None by default):
+    the peto, holding a repository and a database session, is never
+    pickled by accident. The entities and ``kw`` must be picklable, and
+    your jsonright() implementations must be registered in the workers
+    too (automatic with the "fork" start method).
+
+    In CPython, threads only help if your implementations release the GIL
+    (or in free-threaded builds); processes scale on any build.
+    """
+    rows = len(entities)
+    if executor is None or rows < min_rows:
+        return pivot(entities, peto, features, **kw)
+    if not isinstance(entities, list):
+        entities = list(entities)
+    chunks = [entities[i : i + chunk_size] for i in range(0, rows, chunk_size)]
+    shared = peto if isinstance(executor, ThreadPoolExecutor) else worker_peto
+    results = executor.map(
+        _pivot_chunk,
+        chunks,
+        [shared] * len(chunks),
+        [features] * len(chunks),
+        [kw] * len(chunks),
+    )
+    columns = next(results)
+    keys = [column[0] for column in columns]
+    for chunk_columns in results:
+        if [column[0] for column in chunk_columns] != keys:
+            raise RuntimeError(
+                "jsonright cannot pivot sequences containing "
+                "objects of different types if their fields differ. "
+                "Use union=True."
+            )
+        for column, chunk_column in zip(columns, chunk_columns):
+            column.extend(islice(chunk_column, 1, None))
+    return columns
+
+
+class NestedTable(list):
+    """A pivoted child collection whose headers were hoisted to the envelope.
+
+    Its first item is the index of its schema; each following item is the
+    list of values of one column.
+    """
+
+
+@jsonright.register(NestedTable)
+def _n(obj, peto: IUserlessPeto, features=(), **kw) -> NestedTable:
+    return obj  # already encoded
+
+
+def _mark_nested(columns: list[list]) -> list[list]:
+    """Flag, in their headers, the columns containing NestedTables."""
+    for column in columns:
+        if any(isinstance(value, NestedTable) for value in islice(column, 1, None)):
+            header = column[0]
+            if isinstance(header, dict):  # already a sparse column
+                header["nested"] = True
+            else:
+                column[0] = {"key": header, "nested": True}
+    return columns
+
+
+class SchemaIndex:
+    """Collects the distinct headers of the child tables of one encoding.
+
+    Used when ``jsonright()`` receives ``nested=True``: each child
+    collection (e. g. the line items of each order) is pivoted without
+    its headers, which are stored here only once and referenced by index::
+
+        {"jsonright": 2,
+         "schemas": [["sku", "qty"]],
+         "blocks": [[["id", 1, 2],
+                     [{"key": "items", "nested": true},
+                      [0, ["A7", "B2"], [1, 5]],
+                      [0, ["C3"], [2]]]]]}
+    """
+
+    def __init__(self) -> None:  # noqa
+        self.schemas: list[list] = []
+        self._indexes: dict[str, int] = {}
+
+    def hoist(self, columns: list[list]) -> NestedTable:
+        """Store the headers of ``columns``; return the values as a NestedTable."""
+        headers = [column[0] for column in _mark_nested(columns)]
+        signature = dumps(headers)
+        index = self._indexes.get(signature)
+        if index is None:
+            index = self._indexes[signature] = len(self.schemas)
+            self.schemas.append(headers)
+        table = NestedTable((index,))
+        table.extend(column[1:] for column in columns)
+        return table
+
+
+class SnapshotCache:
+    """Bounded server-side store of the rows recently sent to clients.
+
+    Used by ``jsonright_delta()``. Versions are content hashes, so the same
+    data always gets the same version and is stored only once. Only the
+    ``max_versions`` most recently used snapshots are kept. Usually one
+    instance is shared by the whole application; it is thread-safe.
+    """
+
+    def __init__(self, max_versions: int = 64) -> None:  # noqa
+        self.max_versions = max_versions
+        self._snapshots: OrderedDict[str, tuple[tuple, dict]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, version: str) -> tuple[tuple, dict] | None:
+        """Return the (keys, rows by primary key) of ``version``, if known."""
+        with self._lock:
+            snapshot = self._snapshots.get(version)
+            if snapshot is not None:
+                self._snapshots.move_to_end(version)
+            return snapshot
+
+    def put(self, version: str, keys: tuple, rows: dict) -> None:
+        """Store a snapshot, evicting the least recently used if needed."""
+        with self._lock:
+            self._snapshots[version] = (keys, rows)
+            self._snapshots.move_to_end(version)
+            while len(self._snapshots) > self.max_versions:
+                self._snapshots.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+
+def _table(keys: tuple, rows: Iterable[tuple]) -> list[list]:
+    """Pivot already encoded ``rows`` whose values follow ``keys``."""
+    columns: list[list] = [[key] for key in keys]
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+    return columns
+
+
+def jsonright_delta(
+    entities: Iterable[Any],
+    peto: IUserlessPeto,
+    features=(),
+    snapshots: SnapshotCache | None = None,
+    since: str = "",
+    primary_key: str = "id",
+    **kw,
+) -> DictStr:
+    """Encode ``entities`` as a patch against a version the client has.
+
+    For UIs that poll the same list endpoint. The response carries the
+    ``version`` of the current data; the client sends it back in the next
+    poll as ``since``. If that snapshot is still in ``snapshots``, only
+    the differences are sent, by ``primary_key``::
+
+        {"jsonright": 2, "version": "9f...", "since": "4a...",
+         "delta": {"added": [table], "changed": [table], "removed": [ids]}}
+
+    Tables are pivoted; changed rows are sent whole. If ``since`` is
+    unknown (or the fields changed), all rows are sent in the usual
+    blocks envelope, which also has a ``version``. kerno.js applies both.
+    """
+    assert snapshots is not None, "jsonright_delta() requires a SnapshotCache."
+    keys: tuple = ()
+    rows: dict[Any, tuple] = {}
+    for entity in entities:
+        adict = jsonright(entity, peto, features, **kw)
+        if not keys:
+            keys = tuple(adict)
+            getter = schema_getter(keys)
+        rows[adict[primary_key]] = tuple(
+            (
+                value
+                if type(value) in json_scalar_types
+                else jsonright(value, peto, features, **kw)
+            )
+            for value in getter(adict)
+        )
+    version = blake2b(
+        dumps([keys, list(rows.values())]).encode("utf-8"), digest_size=8
+    ).hexdigest()
+    # Look up the base first: storing the new snapshot may evict it.
+    base = snapshots.get(since) if since else None
+    snapshots.put(version, keys, rows)
+    ret: DictStr = {"jsonright": FORMAT_VERSION, "version": version}
+    if base is None or base[0] != keys:
+        ret["blocks"] = [_table(keys, rows.values())] if rows else []
+        return ret
+    old_rows = base[1]
+    ret["since"] = since
+    # Iterate over the rows, not sets, so the client keeps the query order.
+    ret["delta"] = {
+        "added": _table(keys, (row for pk, row in rows.items() if pk not in old_rows)),
+        "changed": _table(
+            keys,
+            (row for pk, row in rows.items() if pk in old_rows and row != old_rows[pk]),
+        ),
+        "removed": [pk for pk in old_rows if pk not in rows],
+    }
+    return ret
+
+
 @jsonright.register(list)
 @jsonright.register(tuple)
 @jsonright.register(set)
 @jsonright.register(frozenset)
-def _s(obj, peto: IUserlessPeto, features=(), **kw) -> Sequence:
+def _s(obj, peto: IUserlessPeto, features=(), **kw) -> Sequence | DictStr:
+    # These options apply only to the outermost sequence:
+    block_size = kw.pop("block_size", 0)
+    dictionary = kw.pop("dictionary", 0)
+    union = kw.pop("union", False)
+    type_tag = kw.pop("type_tag", "")
+    executor = kw.pop("executor", None)
+    nested = kw.pop("nested", False)
+    snapshots = kw.pop("snapshots", None)
+    if snapshots is not None:
+        return jsonright_delta(obj, peto, features, snapshots, **kw)
+    if type(obj) is not tuple and row_fields(obj) is not None:  # a single row
+        return row2dict(obj, peto, features, **kw)
     if len(obj) == 0:
         return []
     first_item = first(obj)
     if isinstance(first_item, primitive_types):
-        return [jsonright(item, peto, features, **kw) for item in obj]
+        return [
+            (
+                item
+                if type(item) in json_scalar_types
+                else jsonright(item, peto, features, **kw)
+            )
+            for item in obj
+        ]
     # Below this line we assume we are dealing with a sequence of entities.
     # In this case we pivot data in order to save bandwidth.
+    schemas = kw.get("schemas")
+    if schemas is not None:  # a child collection inside a nested encoding
+        return schemas.hoist(pivot(obj, peto, features, **kw))
+    if nested:
+        kw["schemas"] = index = SchemaIndex()
+    if block_size or dictionary or union or nested:
+        blocks = iter_blocks(
+            obj,
+            peto,
+            features,
+            block_size or len(obj),
+            dictionary,
+            union,
+            type_tag,
+            **kw,
+        )
+        if not nested:
+            return {"jsonright": FORMAT_VERSION, "blocks": list(blocks)}
+        return {
+            "jsonright": FORMAT_VERSION,
+            "blocks": [_mark_nested(block) for block in blocks],
+            "schemas": index.schemas,
+        }
+    if executor is not None:
+        return pivot_parallel(obj, peto, features, executor, **kw)
+    if row_fields(first_item) is not None:
+        return pivot_rows(obj, peto, features, **kw)
+    return pivot(obj, peto, features, **kw)
+
+
+try:  # SQLAlchemy rows are not tuples, so they need their own registration
+    from sqlalchemy.engine import Row
+except ImportError:
+    pass
+else:
+    jsonright.register(Row)(row2dict)
+
+
+_END = object()  # marks the end of an iterator
+
+
+def _dumps_values(values: list) -> bytes:
+    """Return JSON for ``values`` without the enclosing brackets."""
+    return dumps(values, separators=(",", ":"))[1:-1].encode("utf-8")
+
+
+def jsonright_stream(
+    entities: Iterable[Any],
+    peto: IUserlessPeto,
+    features=(),
+    chunk_size: int = 1000,
+    spool_size: int = 256 * 1024,
+    block_size: int = 0,
+    dictionary: int = 0,
+    union: bool = False,
+    type_tag: str = "",
+    **kw,
+) -> Iterator[bytes]:
+    """Encode ``entities`` like ``jsonright()`` does, yielding JSON bytes.
+
+    ``entities`` can be any iterable, including a SQLAlchemy query
+    using ``yield_per()``; it is consumed only once.
+
+    The output is in the same pivoted column order as ``jsonright()``.
+    Because all values of the first column must be written before the
+    second column starts, each column is accumulated in a
+    ``SpooledTemporaryFile``: it stays in RAM up to ``spool_size`` bytes
+    and then moves to disk. Rows are converted ``chunk_size`` at a time,
+    so memory use is bounded no matter how many rows there are.
+
+    If ``block_size`` is given, the blocks format is written instead,
+    one block per line, and nothing is spooled. ``dictionary`` and
+    ``union`` imply the blocks format (in blocks of ``chunk_size`` rows
+    by default).
+    """
+    if (dictionary or union) and not block_size:
+        block_size = chunk_size
+    iterator = iter(entities)
+    first_item = next(iterator, _END)
+    if first_item is _END:
+        if block_size:
+            yield b'{"jsonright":%d,"blocks":[\n]}' % FORMAT_VERSION
+        else:
+            yield b"[]"
+        return
+
+    def convert(value):
+        if type(value) in json_scalar_types:
+            return value
+        return jsonright(value, peto, features, **kw)
+
+    if isinstance(first_item, primitive_types):  # no pivot needed
+        yield b"["
+        buffer = [convert(first_item)]
+        separator = b""
+        for item in iterator:
+            buffer.append(convert(item))
+            if len(buffer) >= chunk_size:
+                yield separator + _dumps_values(buffer)
+                separator = b","
+                buffer = []
+        if buffer:
+            yield separator + _dumps_values(buffer)
+        yield b"]"
+        return
+
+    if block_size:
+        blocks = iter_blocks(
+            chain((first_item,), iterator),
+            peto,
+            features,
+            block_size,
+            dictionary,
+            union,
+            type_tag,
+            **kw,
+        )
+        yield b'{"jsonright":%d,"blocks":[' % FORMAT_VERSION
+        for index, block in enumerate(blocks):
+            yield (b"\n," if index else b"\n") + dumps(
+                block, separators=(",", ":")
+            ).encode("utf-8")
+        yield b"\n]}"
+        return
+
     first_dict = jsonright(first_item, peto, features, **kw)
-    ret = [[key] for key in first_dict]
-    for entity in obj:
-        adict = jsonright(entity, peto, features, **kw)
-        for alist in ret:
+    keys = tuple(first_dict)
+    getter = schema_getter(keys)
+    spools = [SpooledTemporaryFile(max_size=spool_size) for key in keys]
+    buffers: list[list] = [[] for key in keys]
+
+    def flush():
+        for spool, buffer in zip(spools, buffers):
+            spool.write(b"," + _dumps_values(buffer))
+            buffer.clear()
+
+    try:
+        rows = 0
+        adict = first_dict
+        while True:
             try:
-                val = jsonright(adict[alist[0]], peto, features, **kw)
+                values = getter(adict)
             except KeyError as e:
                 raise RuntimeError(
                     "jsonright cannot pivot sequences containing "
                     "objects of different types if their fields differ."
                 ) from e
-            alist.append(val)
-    return ret
+            for buffer, value in zip(buffers, values):
+                buffer.append(convert(value))
+            rows += 1
+            if rows % chunk_size == 0:
+                flush()
+            entity = next(iterator, _END)
+            if entity is _END:
+                break
+            adict = jsonright(entity, peto, features, **kw)
+        if rows % chunk_size:
+            flush()
+
+        yield b"["
+        for index, (key, spool) in enumerate(zip(keys, spools)):
+            yield (b",[" if index else b"[") + dumps(key).encode("utf-8")
+            spool.seek(0)
+            while chunk := spool.read(spool_size):
+                yield chunk
+            yield b"]"
+        yield b"]"
+    finally:
+        for spool in spools:
+            spool.close()
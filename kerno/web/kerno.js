@@ -1,20 +1,56 @@
 /** @prettier */
 "use strict";
 
-export function jsonrightToEntities(jsonright, cls, useNew = false) {
-	// Usage: const entities = jsonrightToEntities(serverData, MyClass, true);
-	if (!jsonright.length) return [];
-	const entities = [];
-	const iterators = jsonright.map((field) => field.values());
+// Version of the jsonright envelope format. Keep in sync with
+// FORMAT_VERSION in kerno/web/jsonright.py.
+export const JSONRIGHT_FORMAT = 2;
+
+const plainObject = {new: (pojo) => pojo};
+
+function pivotedToEntities(columns, cls, useNew, entities, schemas = []) {
+	// Reassemble the objects of one pivoted table, appending to *entities*.
+	if (!columns.length) return entities;
+	const iterators = columns.map((field) => field.values());
 	for (const i of iterators) {
-		i.key = i.next().value;
+		const header = i.next().value;
+		if (Array.isArray(header)) {
+			// A dictionary-encoded column: [key, distinctValues]
+			[i.key, i.dictionary] = header;
+		} else if (typeof header === "object") {
+			// A sparse column from a union schema: {key, absent}
+			// and/or a column of child tables: {key, nested: true}
+			i.key = header.key;
+			i.absent = header.absent;
+			i.nested = header.nested;
+		} else {
+			i.key = header;
+		}
 	}
 	let iteration = {value: null, done: true};
 	do {
 		const pojo = {};
 		for (const i of iterators) {
 			iteration = i.next();
-			pojo[i.key] = iteration.value;
+			const value = iteration.value;
+			if (i.absent !== undefined && value === i.absent) continue;
+			if (i.dictionary) {
+				pojo[i.key] = i.dictionary[value];
+			} else if (i.nested && Array.isArray(value) && value.length) {
+				// [schemaIndex, column1Values, column2Values, ...]
+				const table = schemas[value[0]].map((header, index) => [
+					header,
+					...value[index + 1],
+				]);
+				pojo[i.key] = pivotedToEntities(
+					table,
+					plainObject,
+					false,
+					[],
+					schemas
+				);
+			} else {
+				pojo[i.key] = value;
+			}
 		}
 		if (!iteration.done) {
 			// $FlowFixMe
@@ -23,3 +59,87 @@ export function jsonrightToEntities(jsonright, cls, useNew = false) {
 	} while (!iteration.done);
 	return entities;
 }
+
+function checkEnvelope(envelope) {
+	if (envelope.jsonright > JSONRIGHT_FORMAT) {
+		throw new Error(
+			`jsonright format ${envelope.jsonright} is newer than this ` +
+				`kerno.js, which understands up to ${JSONRIGHT_FORMAT}.`
+		);
+	}
+}
+
+export function jsonrightToEntities(jsonright, cls, useNew = false) {
+	// Usage: const entities = jsonrightToEntities(serverData, MyClass, true);
+	// Accepts both a plain pivoted table and the envelope with blocks.
+	if (Array.isArray(jsonright)) {
+		return pivotedToEntities(jsonright, cls, useNew, []);
+	}
+	checkEnvelope(jsonright);
+	const entities = [];
+	for (const block of jsonright.blocks) {
+		pivotedToEntities(block, cls, useNew, entities, jsonright.schemas);
+	}
+	return entities;
+}
+
+export function jsonrightApplyDelta(
+	entitiesByKey,
+	payload,
+	cls,
+	useNew = false,
+	primaryKey = "id"
+) {
+	// Keep an in-memory table up to date by polling a list endpoint that
+	// uses jsonright deltas. *entitiesByKey* is a Map owned by the caller.
+	// Returns the version to be sent as "since" in the next poll:
+	//   since = jsonrightApplyDelta(rows, await (await fetch(url)).json(), Cls);
+	checkEnvelope(payload);
+	const upsert = (table) => {
+		for (const entity of pivotedToEntities(table, cls, useNew, [])) {
+			entitiesByKey.set(entity[primaryKey], entity);
+		}
+	};
+	if (payload.delta) {
+		for (const key of payload.delta.removed) entitiesByKey.delete(key);
+		upsert(payload.delta.added);
+		upsert(payload.delta.changed);
+	} else {
+		entitiesByKey.clear();
+		for (const block of payload.blocks) upsert(block);
+	}
+	return payload.version;
+}
+
+export async function* jsonrightStreamBlocks(response, cls, useNew = false) {
+	// Progressively decode a streamed jsonright response (written with a
+	// block_size), yielding an array of entities for each block received:
+	//   for await (const rows of jsonrightStreamBlocks(await fetch(url), Cls))
+	//       table.append(rows);
+	const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+	let pending = "";
+	let header = true;
+	const decodeLine = (line) => {
+		if (header) {
+			header = false;
+			checkEnvelope(JSON.parse(line + "]}"));
+			return null;
+		}
+		if (line.startsWith(",")) line = line.slice(1);
+		if (!line || line === "]}") return null;
+		return pivotedToEntities(JSON.parse(line), cls, useNew, []);
+	};
+	while (true) {
+		const {value, done} = await reader.read();
+		if (done) break;
+		pending += value;
+		const lines = pending.split("\n");
+		pending = lines.pop();
+		for (const line of lines) {
+			const entities = decodeLine(line);
+			if (entities) yield entities;
+		}
+	}
+	const entities = decodeLine(pending);
+	if (entities) yield entities;
+}
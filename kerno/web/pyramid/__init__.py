@@ -3,7 +3,7 @@
 from functools import wraps
 import inspect
 from json import dumps
-from typing import Callable
+from typing import Any, Callable, Iterable
 
 from bag.web.exceptions import Problem
 
@@ -11,8 +11,11 @@ from bag.web.exceptions import Problem
 from zope.interface import Interface  # type: ignore[import]
 
 from kerno.bases import Kerno
+from kerno.protocols import IUserlessPeto
 from kerno.state import MalbonaRezulto, Rezulto, to_dict
-from .typing import DictStr, KRequest
+from kerno.web.binary import backends, jsonright_binary
+from kerno.web.jsonright import jsonright_stream
+from .typing import DictStr, KRequest, PyramidResponse
 
 
 def kerno_view(view_fn: Callable) -> Callable:
@@ -78,6 +81,54 @@ def malbona_view(context, request) -> DictStr:
     return to_dict(context)
 
 
+def jsonright_response(
+    request: KRequest,
+    entities: Iterable[Any],
+    peto: IUserlessPeto,
+    features=(),
+    **kw,
+) -> PyramidResponse:
+    """Return ``request.response`` containing ``entities`` through jsonright.
+
+    Content negotiation happens through the Accept header. If the client
+    prefers one of the binary backends registered in ``kerno.web.binary``
+    (e. g. "application/cbor"), the body is encoded by it, in native mode.
+
+    Otherwise the JSON is produced incrementally by ``jsonright_stream()``
+    and handed to the WSGI server as the ``app_iter``, so the whole payload
+    is never in memory at once.
+
+    The WSGI server iterates the ``app_iter`` only after the view has
+    returned, when pyramid_tm has already committed the transaction and
+    closed the request's session. So ``entities`` must either be in
+    memory already (e. g. the result of ``query.all()``) or come from a
+    session and transaction that stay open until the iteration ends,
+    such as a session opened by the iterator itself::
+
+        @view_config(route_name="products")
+        def products(request):
+            def rows():
+                with session_factory() as sas:  # not managed by pyramid_tm
+                    yield from sas.query(Product).yield_per(1000)
+
+            return jsonright_response(request, rows(), peto)
+    """
+    response = request.response
+    offers = ["application/json", *backends]
+    acceptable = request.accept.acceptable_offers(offers)
+    content_type = acceptable[0][0] if acceptable else "application/json"
+    response.content_type = content_type
+    response.vary = ("Accept",)  # so shared caches do not mix the formats
+    if content_type in backends:
+        response.body = jsonright_binary(
+            list(entities), peto, features, content_type=content_type, **kw
+        )
+    else:
+        response.charset = "utf-8"
+        response.app_iter = jsonright_stream(entities, peto, features, **kw)
+    return response
+
+
 def raise_if_not_authenticated(request: KRequest) -> None:
     """Return 418 if the client is not authenticated.
 
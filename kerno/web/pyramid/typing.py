@@ -1,6 +1,6 @@
 """Pyramid typing stubs so we can write annotated views."""
 
-from typing import Any, Optional, Union
+from typing import Any, Iterable, Optional, Union
 
 from kerno.bases import Kerno
 from kerno.protocols import IRepo
@@ -74,6 +74,8 @@ class PyramidResponse:
     headerlist: list[tuple[str, str]]
     headers: DictStr
     body: bytes
+    app_iter: Iterable[bytes]
+    vary: tuple[str, ...] | None
 
 
 class PyramidRequest:
@@ -107,6 +109,7 @@ class PyramidRequest:
     registry: RegistryStub
 
     body: bytes
+    accept: Any
     accept_language: Any
     cookies: DictStr
     session: PyramidSession
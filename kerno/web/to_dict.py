@@ -40,15 +40,17 @@ Please see a usage example in
 `our tests <https://github.com/nandoflorestan/kerno/blob/master/tests/test_web_to_dict.py>`_.
 """
 
-from collections import OrderedDict
-from datetime import date, datetime
+from datetime import date
 from decimal import Decimal
-from typing import Any, Iterable, Sequence
+from operator import attrgetter
+from typing import Any, Callable, Iterable, Sequence
 from warnings import warn
 
 # 2023-08: reg lacks py.typed
 import reg  # type: ignore[import]
 
+from kerno.typing import DictStr
+
 warn(
     "to_dict will be removed in a future version of kerno. Use jsonright instead.",
     DeprecationWarning,
@@ -75,44 +77,165 @@ def excluding(blacklist: Sequence, keys: Iterable) -> Iterable:  # noqa
     return filter(lambda k: k not in blacklist, keys)
 
 
+_KEEP = object()  # marks values that need no conversion for JSON
+_SKIP = object()  # marks values that cannot go into JSON
+_json_actions: dict[type, Any] = {}  # a cache of _json_action()
+
+
+def _isoformat(val: date) -> str:
+    return val.isoformat()
+
+
+def _decimal_to_float(val: Decimal) -> float:
+    return float(str(val))
+
+
+def _json_action(cls: type) -> Any:
+    """Return how values of type ``cls`` are converted: a function or a marker."""
+    action = _json_actions.get(cls)
+    if action is None:
+        if issubclass(cls, date):  # includes datetime
+            action = _isoformat
+        elif issubclass(cls, Decimal):
+            action = _decimal_to_float
+        elif issubclass(cls, (str, int, float, list, dict, bool, type(None))):
+            action = _KEEP
+        else:
+            action = _SKIP
+        _json_actions[cls] = action
+    return action
+
+
+def _compile_plan(keys: tuple[str, ...], for_json: bool) -> Callable[[Any], DictStr]:
+    """Return a function that converts the attributes ``keys`` of an object."""
+    if not keys:
+        return lambda obj: {}
+    getter = attrgetter(*keys)
+    if len(keys) == 1:  # attrgetter returns a scalar, not a tuple, in this case
+        values = lambda obj: (getter(obj),)  # noqa: E731
+    else:
+        values = getter
+    if not for_json:
+        return lambda obj: dict(zip(keys, values(obj)))
+
+    def convert(obj: Any) -> DictStr:
+        amap = {}
+        for key, val in zip(keys, values(obj)):
+            action = _json_actions.get(val.__class__) or _json_action(val.__class__)
+            if action is _KEEP:
+                amap[key] = val
+            elif action is not _SKIP:
+                amap[key] = action(val)
+        return amap
+
+    return convert
+
+
+_plans: dict[tuple, Callable[[Any], DictStr]] = {}
+
+
 def reuse_dict(
     obj: Any,
     keys: Iterable = (),
     for_json: bool = True,
     sort: bool = True,
     **kw,
-) -> OrderedDict:
-    """Dump the instance variables of ``obj`` into an OrderedDict.
+) -> DictStr:
+    """Dump the instance variables of ``obj`` into a dictionary.
 
     This function is reusable and free of Reg dispatch.
 
     If the ``for_json`` flag is True, convert certain types.
 
-    If the ``sort`` flag is True, sort the OrderedDict.
+    If the ``sort`` flag is True, sort the keys.
+
+    A conversion plan, with the final key order, is compiled once per
+    combination of class, keys and flags, then reused for other objects.
     """
-    amap: OrderedDict[str, Any] = OrderedDict()
-    kk = keys or excluding(("password",), only_relevant(keys_from(obj)))
-    if sort:
-        kk = sorted(kk)
-    for key in kk:
-        val = getattr(obj, key)
-        # TODO Probably should treat Python types elsewhere!
-        if for_json and (isinstance(val, datetime) or isinstance(val, date)):
-            amap[key] = val.isoformat()
-        elif for_json and isinstance(val, Decimal):
-            amap[key] = float(str(val))
-        elif for_json and not isinstance(
-            val, (str, int, float, list, dict, bool, type(None))
-        ):
-            continue
-        else:
-            amap[key] = val
-    return amap
+    explicit = bool(keys)
+    kk = tuple(keys) if explicit else tuple(keys_from(obj))
+    signature = (obj.__class__, kk, explicit, for_json, sort)
+    plan = _plans.get(signature)
+    if plan is None:
+        if not explicit:
+            kk = tuple(excluding(("password",), only_relevant(kk)))
+        if sort:
+            kk = tuple(sorted(kk))
+        plan = _plans[signature] = _compile_plan(kk, for_json)
+    return plan(obj)
+
+
+class CountingKeyLookup:
+    """Reg key lookup that caches dispatch resolution and counts hits.
+
+    For to_dict() the dispatch key is ``(type(obj), flavor)``. Resolving it
+    (walking the MRO against the registered implementations) is done once
+    per key; later calls are a dictionary lookup.
+
+    Implements the read-only API of ``reg.PredicateRegistry``. The cache is
+    emptied automatically whenever a new implementation is registered.
+    The counters can be read through ``to_dict.key_lookup.stats()``.
+    """
+
+    def __init__(self, key_lookup) -> None:  # noqa
+        self.key_lookup = key_lookup
+        self.hits = 0
+        self.misses = 0
+        self._components: dict[tuple, Any] = {}
+        self._fallbacks: dict[tuple, Any] = {}
+        self._all: dict[tuple, list] = {}
+
+        register = key_lookup.register
+
+        def register_and_clear(key, value):
+            register(key, value)
+            self.clear()
+
+        key_lookup.register = register_and_clear
+
+    def component(self, key: tuple) -> Any:  # noqa
+        try:
+            found = self._components[key]
+        except KeyError:
+            self.misses += 1
+            found = self._components[key] = self.key_lookup.component(key)
+            return found
+        self.hits += 1
+        return found
+
+    def fallback(self, key: tuple) -> Any:  # noqa
+        try:
+            return self._fallbacks[key]
+        except KeyError:
+            found = self._fallbacks[key] = self.key_lookup.fallback(key)
+            return found
+
+    def all(self, key: tuple) -> list:  # noqa
+        try:
+            return self._all[key]
+        except KeyError:
+            found = self._all[key] = list(self.key_lookup.all(key))
+            return found
+
+    def clear(self) -> None:
+        """Forget all resolved dispatch keys."""
+        self._components.clear()
+        self._fallbacks.clear()
+        self._all.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit and miss counters and the size of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._components),
+        }
 
 
 @reg.dispatch(  # Dispatch on type of *obj* and value of *flavor*.
     reg.match_instance("obj"),
     reg.match_key("flavor", lambda obj, flavor, **kw: flavor),
+    get_key_lookup=CountingKeyLookup,
 )
 # Cannot type-annotate this function, Reg 0.11 does not support it
 def to_dict(obj, flavor="", **kw):
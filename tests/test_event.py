@@ -0,0 +1,435 @@
+"""Tests for the kerno.event module."""
+
+import asyncio
+import gc
+from json import loads
+from threading import Event, get_ident
+from time import monotonic, sleep
+import tracemalloc
+from unittest import TestCase
+
+from kerno.event import DeferredEvents, EventHub, StopPropagation
+
+
+class EventBase:  # noqa
+    pass
+
+
+class EventChild(EventBase):  # noqa
+    pass
+
+
+class TestDispatch(TestCase):  # noqa
+    def setUp(self):  # noqa
+        self.hub = EventHub()
+        self.calls: list[tuple[str, object]] = []
+
+    def handler(self, name: str):  # noqa
+        def fn(event):
+            self.calls.append((name, event))
+
+        return fn
+
+    def test_base_class_handlers_fire(self):  # noqa
+        on_base = self.hub.subscribe(EventBase, self.handler("base"))
+        self.hub.subscribe(EventChild, self.handler("child"))
+        event = EventChild()
+        self.hub.broadcast(event)
+        assert self.calls == [("child", event), ("base", event)]
+        self.calls.clear()
+        base_event = EventBase()
+        self.hub.broadcast(base_event)
+        assert self.calls == [("base", base_event)]
+        # The same function subscribed twice in the hierarchy runs once
+        self.hub.subscribe(EventChild, on_base)
+        assert self.hub.handlers_for(EventChild).count(on_base) == 1
+
+    def test_dispatch_table_is_invalidated(self):  # noqa
+        self.hub.broadcast(EventChild())
+        assert self.hub.handlers_for(EventChild) == ()
+        fn = self.hub.subscribe(EventBase, self.handler("base"))
+        assert self.hub.handlers_for(EventChild) == (fn,)
+        assert self.hub.unsubscribe(EventBase, fn)
+        assert not self.hub.unsubscribe(EventBase, fn)
+        assert self.hub.handlers_for(EventChild) == ()
+
+    def test_subscribe_while_computing_the_table(self):  # noqa
+        stats = self.hub.instrument()
+        assert stats
+        original_wrap = stats.wrap
+        self.hub.subscribe(EventBase, self.handler("old"))
+
+        def wrap(event_cls, handle, fn):
+            stats.wrap = original_wrap  # type: ignore[method-assign]
+            self.hub.subscribe(EventBase, self.handler("late"))  # another thread
+            return original_wrap(event_cls, handle, fn)
+
+        stats.wrap = wrap  # type: ignore[method-assign]
+        # This table was computed from the old subscriptions, so not cached
+        assert len(self.hub.handlers_for(EventChild)) == 1
+        assert len(self.hub.handlers_for(EventChild)) == 2
+        assert len(self.hub.lanes_for(EventChild)[0]) == 2
+
+    def test_no_growth_on_broadcast(self):  # noqa
+        self.hub.broadcast(EventChild())
+        assert not self.hub.unsubscribe(EventChild, print)
+        assert self.hub._events == {}
+
+
+class TestConcurrent(TestCase):  # noqa
+    def setUp(self):  # noqa
+        self.hub = EventHub(max_workers=2)
+        self.addCleanup(self.hub.shutdown)
+
+    def test_threaded_handlers_overlap(self):  # noqa
+        both_running = Event()
+        ran_in: set[int] = set()
+
+        def first(event):
+            ran_in.add(get_ident())
+            assert both_running.wait(timeout=5)
+
+        def second(event):
+            ran_in.add(get_ident())
+            both_running.set()
+
+        self.hub.subscribe(EventBase, first)
+        self.hub.subscribe(EventBase, second)
+        assert self.hub.broadcast_threaded(EventBase()) == []
+        assert len(ran_in) == 2 and get_ident() not in ran_in
+
+    def test_error_policies(self):  # noqa
+        def fail(event):
+            raise ValueError("boom")
+
+        def slow(event):
+            sleep(0.2)
+
+        self.hub.subscribe(EventBase, fail)
+        self.hub.subscribe(EventBase, slow)
+        errors = self.hub.broadcast_threaded(
+            EventBase(), timeout=0.01, errors="collect"
+        )
+        assert [type(e) for e in errors] == [ValueError, TimeoutError]
+        with self.assertRaises(ExceptionGroup) as caught:
+            self.hub.broadcast_threaded(EventBase())
+        assert [type(e) for e in caught.exception.exceptions] == [ValueError]
+
+    def test_timeout_is_a_deadline(self):  # noqa
+        ran: list[str] = []
+        self.hub.subscribe(EventBase, lambda event: sleep(0.15))
+        self.hub.subscribe(EventBase, lambda event: sleep(0.18))
+        self.hub.subscribe(EventBase, lambda event: ran.append("queued"))
+        start = monotonic()
+        errors = self.hub.broadcast_threaded(EventBase(), timeout=0.1, errors="collect")
+        assert monotonic() - start < 0.15
+        assert [type(e) for e in errors] == [TimeoutError] * 3
+        self.hub.shutdown()
+        assert ran == []  # cancelled before it started
+
+    def test_abroadcast(self):  # noqa
+        received = []
+
+        async def coroutine_handler(event):
+            await asyncio.sleep(0.05)
+            received.append("async")
+
+        async def hanging_handler(event):
+            await asyncio.sleep(10)
+
+        self.hub.subscribe(EventBase, coroutine_handler)
+        self.hub.subscribe(EventBase, received.append)
+        self.hub.subscribe(EventChild, hanging_handler)
+        event = EventChild()
+        errors = asyncio.run(self.hub.abroadcast(event, timeout=0.5, errors="collect"))
+        assert [type(e) for e in errors] == [TimeoutError]
+        assert len(received) == 2 and "async" in received and event in received
+
+
+class TestDeferred(TestCase):  # noqa
+    def test_flush_and_discard(self):  # noqa
+        hub = EventHub()
+        self.addCleanup(hub.shutdown)
+        received: list = []
+
+        def fail(event):
+            raise ValueError("Logged, does not stop delivery")
+
+        hub.subscribe(EventBase, received.append)
+        hub.subscribe(EventBase, fail)
+        deferred = DeferredEvents(hub)
+        deferred.broadcast("rolled back")
+        deferred.discard()
+        events = [EventBase(), EventChild()]
+        for event in events:
+            deferred.broadcast(event)
+        assert received == []  # nothing happens before the commit
+        with self.assertLogs("kerno.event"):
+            deferred.flush().result(timeout=5)
+        assert received == events
+        assert deferred.pending == []
+        assert deferred.flush() is None
+
+
+class TestBatching(TestCase):  # noqa
+    def setUp(self):  # noqa
+        self.hub = EventHub()
+        self.batches: list[list] = []
+        self.singles: list = []
+        self.hub.subscribe(EventBase, self.singles.append)
+        self.hub.subscribe(
+            EventBase, self.batches.append, batch=True, key=lambda e: e.id
+        )
+
+    def event(self, id: int, cls: type = EventBase):  # noqa
+        event = cls()
+        event.id = id
+        return event
+
+    def test_batching_scope(self):  # noqa
+        events = [self.event(i % 3) for i in range(1000)]
+        child = self.event(0, EventChild)
+        with self.hub.batching():
+            for event in events:
+                self.hub.broadcast(event)
+            with self.hub.batching():  # nested blocks do not deliver
+                self.hub.broadcast(child)
+            assert self.batches == []
+        assert len(self.singles) == 1001  # ordinary handlers are not delayed
+        # Grouped per class; deduplicated by key, keeping the last event
+        assert self.batches == [events[-3:], [child]]
+
+    def test_outside_of_scope(self):  # noqa
+        event = self.event(1)
+        self.hub.broadcast(event)
+        assert self.batches == [[event]]
+        assert self.hub.unsubscribe(EventBase, self.batches.append)
+        assert self.hub.handlers_for(EventBase) == (self.singles.append,)
+
+    def test_concurrent_modes(self):  # noqa
+        self.addCleanup(self.hub.shutdown)
+        events = [self.event(i) for i in range(3)]
+        with self.hub.batching():
+            for event in events:
+                self.hub.broadcast_threaded(event)
+        assert self.batches == [events]
+        self.batches.clear()
+
+        async def scenario():
+            with self.hub.batching():
+                for event in events:
+                    await self.hub.abroadcast(event)
+
+        asyncio.run(scenario())
+        assert self.batches == [events]
+
+    def test_coroutine_batch_handler(self):  # noqa
+        received: list[list] = []
+
+        async def handler(events):
+            await asyncio.sleep(0)
+            received.append(events)
+
+        hub = EventHub()
+        hub.subscribe(EventBase, handler, batch=True)
+        events = [self.event(i) for i in range(3)]
+
+        async def scenario():
+            await hub.abroadcast(events[0])
+            async with hub.abatching():
+                for event in events:
+                    await hub.abroadcast(event)
+
+        asyncio.run(scenario())
+        assert received == [events[:1], events]
+
+    def test_window(self):  # noqa
+        with self.hub.batching(window=0):
+            self.hub.broadcast(self.event(1))
+            self.hub.broadcast(self.event(2))
+            assert len(self.batches) == 1
+        assert len(self.batches) == 2
+
+
+class Transient:  # noqa
+    def __init__(self, received: list) -> None:  # noqa
+        self.received = received
+
+    def handle(self, event) -> None:  # noqa
+        self.received.append(event)
+
+
+class TestWeakSubscriptions(TestCase):  # noqa
+    def test_collected_subscriber_is_removed(self):  # noqa
+        hub = EventHub()
+        received: list = []
+        owner = Transient(received)
+        hub.subscribe(EventBase, owner.handle, weak=True)
+        with self.assertRaises(RuntimeError):
+            hub.subscribe(EventBase, owner.handle)
+        event = EventChild()
+        hub.broadcast(event)
+        assert received == [event]
+        del owner
+        gc.collect()
+        assert hub.handlers_for(EventChild) == ()
+        assert hub._events == {}
+
+    def test_unhashable_callables(self):  # noqa
+        class Handler:  # defines __eq__, so it is not hashable
+            def __init__(self, received):
+                self.received = received
+
+            def __eq__(self, other):
+                return isinstance(other, Handler)
+
+            def __call__(self, event):
+                self.received.append(event)
+
+        hub = EventHub()
+        received: list = []
+        strong, weak = Handler(received), Handler(received)
+        hub.subscribe(EventBase, strong)
+        hub.subscribe(EventBase, weak, weak=True)  # equal, but not the same
+        with self.assertRaises(RuntimeError):
+            hub.subscribe(EventBase, strong, weak=True)
+        hub.broadcast(EventBase())
+        assert len(received) == 2
+        assert hub.instrument()
+        hub.broadcast(EventBase())
+        del weak
+        gc.collect()
+        assert len(hub.handlers_for(EventBase)) == 1
+        assert hub.unsubscribe(EventBase, strong)
+        assert hub._events == {}
+
+    def test_unsubscribe_weak(self):  # noqa
+        hub = EventHub()
+        owner = Transient([])
+        hub.subscribe(EventBase, owner.handle, weak=True, batch=True)
+        assert hub.unsubscribe(EventBase, owner.handle)
+        assert not hub.unsubscribe(EventBase, owner.handle)
+
+    def test_collection_during_handlers_for(self):  # noqa
+        hub = EventHub()
+        owners = [Transient([]) for _ in range(50)]
+        for owner in owners:
+            hub.subscribe(EventBase, owner.handle, weak=True)
+        del owner
+        stats = hub.instrument()
+        assert stats
+
+        def wrap(event_cls, handle, fn, wrap=stats.wrap):
+            owners.clear()  # finalizers fire in the middle of the iteration
+            return wrap(event_cls, handle, fn)
+
+        stats.wrap = wrap  # type: ignore[method-assign]
+        hub.handlers_for(EventBase)
+        assert hub.handlers_for(EventBase) == ()
+
+    def test_memory_does_not_grow(self):  # noqa
+        hub = EventHub()
+        received: list = []
+        hub.subscribe(EventBase, Transient(received).handle, weak=True)  # warm up
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(100_000):
+                hub.subscribe(EventBase, Transient(received).handle, weak=True)
+            gc.collect()
+            assert hub.handlers_for(EventBase) == ()
+            growth = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        assert hub._events == {} and not hub._dead
+        assert growth < 64 * 1024, growth
+
+
+class TestInstrumentation(TestCase):  # noqa
+    def test_statistics(self):  # noqa
+        hub = EventHub()
+
+        def ok(event):
+            pass
+
+        def fail(event):
+            raise ValueError()
+
+        hub.subscribe(EventBase, ok)
+        hub.subscribe(EventChild, fail)
+        uninstrumented = hub.handlers_for(EventChild)
+        assert uninstrumented == (fail, ok)  # no wrappers while disabled
+        stats = hub.instrument()
+        assert stats
+        hub.broadcast(EventBase())
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                hub.broadcast(EventChild())
+        snapshot = loads(stats.to_json())
+        child = snapshot[f"{__name__}.EventChild"]
+        local = f"{__name__}.TestInstrumentation.test_statistics.<locals>."
+        assert child[local + "fail"]["errors"] == 3
+        assert child[local + "ok"]["calls"] == 0  # the exception stopped it
+        base = snapshot[f"{__name__}.EventBase"]
+        (ok_stats,) = base.values()
+        assert ok_stats["calls"] == 1
+        assert 0 <= ok_stats["p50_seconds"] <= ok_stats["max_seconds"]
+        assert hub.instrument(enabled=False) is None
+        assert hub.handlers_for(EventChild) == uninstrumented
+
+    def test_same_names(self):  # noqa
+        hub = EventHub()
+        hub.subscribe(EventBase, lambda event: None)
+        hub.subscribe(EventBase, lambda event: sleep(0.01))
+        stats = hub.instrument()
+        assert stats
+        hub.broadcast(EventBase())
+        hub.subscribe(EventChild, print)  # handlers are wrapped again
+        hub.broadcast(EventBase())
+        (base,) = stats.snapshot().values()
+        name = f"{__name__}.TestInstrumentation.test_same_names.<locals>.<lambda>"
+        assert list(base) == [name, name + "#2"]
+        assert [s["calls"] for s in base.values()] == [2, 2]
+        assert base[name]["max_seconds"] < base[name + "#2"]["max_seconds"]
+
+
+class TestPriorities(TestCase):  # noqa
+    def setUp(self):  # noqa
+        self.hub = EventHub()
+        self.addCleanup(self.hub.shutdown)
+        self.calls: list[str] = []
+
+    def handler(self, name: str, veto: bool = False):  # noqa
+        def fn(event):
+            self.calls.append(name)
+            if veto and getattr(event, "rejected", False):
+                raise StopPropagation()
+
+        return fn
+
+    def subscribe_all(self):  # noqa
+        self.hub.subscribe(EventBase, self.handler("expensive"), priority=-10)
+        self.hub.subscribe(EventBase, self.handler("base"))
+        self.hub.subscribe(EventChild, self.handler("child"))
+        self.hub.subscribe(EventBase, self.handler("veto", veto=True), priority=10)
+        self.hub.subscribe(EventChild, self.handler("cache"), priority=5)
+
+    def test_order(self):  # noqa
+        self.subscribe_all()
+        assert self.hub.broadcast(EventChild())
+        assert self.calls == ["veto", "cache", "child", "base", "expensive"]
+        assert [len(lane) for lane in self.hub.lanes_for(EventChild)] == [1, 1, 2, 1]
+
+    def test_cancellation(self):  # noqa
+        self.subscribe_all()
+        event = EventChild()
+        event.rejected = True
+        assert not self.hub.broadcast(event)
+        assert self.calls == ["veto"]
+        self.calls.clear()
+        assert self.hub.broadcast_threaded(event) == []
+        assert self.calls == ["veto"]
+        self.calls.clear()
+        assert asyncio.run(self.hub.abroadcast(event)) == []
+        assert self.calls == ["veto"]
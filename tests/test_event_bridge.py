@@ -0,0 +1,125 @@
+"""Tests for the kerno.event_bridge module."""
+
+import os
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import sleep
+from unittest import TestCase
+
+from kerno.event import EventHub
+from kerno.event_bridge import EventBridge, UnixSocketTransport
+
+
+class CacheInvalidated:  # noqa
+    def __init__(self, key: str) -> None:  # noqa
+        self.key = key
+
+
+class StuckTransport:
+    """A transport whose peer never reads, to exercise backpressure."""
+
+    def __init__(self) -> None:  # noqa
+        self.unblock = Event()
+
+    def send(self, message: bytes) -> None:  # noqa
+        self.unblock.wait(timeout=5)
+
+    def receive(self, timeout: float) -> bytes | None:  # noqa
+        self.unblock.wait(timeout=timeout)
+        return None
+
+    def close(self) -> None:  # noqa
+        pass
+
+
+class TestEventBridge(TestCase):  # noqa
+    def test_events_reach_the_other_hub(self):  # noqa
+        with TemporaryDirectory() as directory:
+            hub_a, hub_b = EventHub(), EventHub()
+            received_a: list = []
+            received_b: list = []
+            hub_a.subscribe(CacheInvalidated, lambda e: received_a.append(e.key))
+            hub_b.subscribe(CacheInvalidated, lambda e: received_b.append(e.key))
+            bridges = [
+                EventBridge(
+                    hub, [CacheInvalidated], transport=UnixSocketTransport(directory)
+                )
+                for hub in (hub_a, hub_b)
+            ]
+            for bridge in bridges:
+                bridge.start()
+            try:
+                for key in ("a", "b", "c"):
+                    hub_a.broadcast(CacheInvalidated(key))
+                for _ in range(100):  # wait for the delivery
+                    if len(received_b) == 3:
+                        break
+                    sleep(0.05)
+            finally:
+                for bridge in bridges:
+                    bridge.stop()
+            assert received_b == ["a", "b", "c"]
+            assert received_a == ["a", "b", "c"]  # and no echo came back
+
+    def test_backpressure(self):  # noqa
+        hub = EventHub()
+        transport = StuckTransport()
+        bridge = EventBridge(
+            hub,
+            [CacheInvalidated],
+            transport=transport,
+            batch_size=1,
+            backlog=2,
+            block_timeout=0.01,
+        ).start()
+        try:
+            for key in range(10):
+                hub.broadcast(CacheInvalidated(str(key)))
+            assert bridge.dropped >= 10 - 3  # 1 being sent and 2 in the backlog
+        finally:
+            transport.unblock.set()
+            bridge.stop()
+
+    def test_large_and_broken_messages(self):  # noqa
+        with TemporaryDirectory() as directory:
+            hub_a, hub_b = EventHub(), EventHub()
+            received: list = []
+            hub_b.subscribe(CacheInvalidated, lambda e: received.append(e.key))
+            transport_a = UnixSocketTransport(directory)
+            with self.assertRaises(OSError):
+                transport_a.send(b"x" * (transport_a.max_size + 1))
+            bridges = [
+                EventBridge(hub_a, [CacheInvalidated], transport=transport_a),
+                EventBridge(
+                    hub_b, [CacheInvalidated], transport=UnixSocketTransport(directory)
+                ),
+            ]
+            for bridge in bridges:
+                bridge.start()
+            try:
+                with self.assertLogs("kerno.event_bridge"):
+                    transport_a.send(b"not a pickle")
+                    sleep(0.2)
+                # 10 events of 20 KB do not fit in one datagram
+                keys = [str(i) * 20_000 for i in range(10)]
+                for key in keys:
+                    hub_a.broadcast(CacheInvalidated(key))
+                for _ in range(100):
+                    if len(received) == len(keys):
+                        break
+                    sleep(0.05)
+            finally:
+                for bridge in bridges:
+                    bridge.stop()
+            assert received == keys
+
+    def test_directory_must_be_private(self):  # noqa
+        with TemporaryDirectory() as directory:
+            shared = os.path.join(directory, "shared")
+            os.mkdir(shared, mode=0o777)
+            os.chmod(shared, 0o777)
+            with self.assertRaises(PermissionError):
+                UnixSocketTransport(shared)
+            private = os.path.join(directory, "private")
+            UnixSocketTransport(private).close()
+            assert os.stat(private).st_mode & 0o777 == 0o700
@@ -0,0 +1,74 @@
+"""Tests for the kerno.event_journal module."""
+
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from kerno.event import EventHub
+from kerno.event_journal import EventJournal
+
+
+class OrderPlaced:  # noqa
+    def __init__(self, id: int) -> None:  # noqa
+        self.id = id
+
+
+class NotJournaled:  # noqa
+    pass
+
+
+class TestEventJournal(TestCase):  # noqa
+    def setUp(self):  # noqa
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "events.sqlite3")
+
+    def test_journal_and_replay(self):  # noqa
+        hub = EventHub()
+        journal = EventJournal(hub, [OrderPlaced], self.path).start()
+        for id in range(1000):
+            hub.broadcast(OrderPlaced(id))
+        hub.broadcast(NotJournaled())
+        journal.flush()
+        journal.stop()
+
+        # After a restart, a new hub catches up
+        hub = EventHub()
+        received: list[int] = []
+        hub.subscribe(OrderPlaced, lambda event: received.append(event.id))
+        journal = EventJournal(hub, [OrderPlaced], self.path).start()
+        checkpoint = journal.replay(since=990)
+        assert received == list(range(990, 1000))
+        assert checkpoint == 1000
+        received.clear()
+        assert journal.replay() == 1000
+        assert received == list(range(1000))
+        journal.flush()
+        journal.stop()
+        # Replayed events were not journaled again
+        assert [seq for seq, event in journal.read(since=999)] == [1000]
+
+    def test_failing_handlers(self):  # noqa
+        hub = EventHub()
+
+        def fail(event):
+            if event.id == 3:
+                raise ValueError(event.id)
+
+        hub.subscribe(OrderPlaced, fail)
+        journal = EventJournal(hub, [OrderPlaced], self.path).start()
+        for id in range(5):
+            try:
+                hub.broadcast(OrderPlaced(id))
+            except ValueError:
+                pass
+        journal.flush()
+        journal.stop()
+        # The event was journaled even though a handler raised
+        assert [event.id for seq, event in journal.read()] == [0, 1, 2, 3, 4]
+
+        with self.assertRaises(ValueError):
+            journal.replay()
+        assert journal.checkpoint == 3  # the event with id 2
+        hub.unsubscribe(OrderPlaced, fail)
+        assert journal.replay(since=journal.checkpoint) == 5
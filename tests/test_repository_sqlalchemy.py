@@ -0,0 +1,67 @@
+"""Tests for the kerno.repository.sqlalchemy module."""
+
+from types import SimpleNamespace
+from unittest import skipIf, TestCase
+
+from kerno.event import EventHub
+from kerno.repository.sqlalchemy import BaseSQLAlchemyRepository
+
+try:
+    import sqlalchemy
+    from sqlalchemy.orm import scoped_session, sessionmaker
+except ImportError:
+    sqlalchemy = None  # type: ignore[assignment]
+
+
+class Happened:  # noqa
+    def __init__(self, n: int) -> None:  # noqa
+        self.n = n
+
+
+@skipIf(sqlalchemy is None, "SQLAlchemy is not installed")
+class TestDeferredEvents(TestCase):  # noqa
+    def setUp(self):  # noqa
+        self.hub = EventHub()
+        self.addCleanup(self.hub.shutdown)
+        self.received: list[int] = []
+        self.hub.subscribe(Happened, lambda event: self.received.append(event.n))
+        self.kerno = SimpleNamespace(events=self.hub, utilities={})
+        engine = sqlalchemy.create_engine("sqlite://")
+        self.sas = scoped_session(sessionmaker(bind=engine))
+        self.addCleanup(self.sas.remove)
+
+    def test_scoped_session_is_watched_once(self):  # noqa
+        queues = set()
+        for n in range(3):  # one repository per request
+            repo = BaseSQLAlchemyRepository(self.kerno, session_factory=self.sas)
+            repo.events.broadcast(Happened(n))
+            queues.add(id(repo.events))
+            self.sas.commit()
+        self.hub.shutdown()
+        assert self.received == [0, 1, 2]
+        assert len(queues) == 1
+        session = self.sas()
+        assert len(session.dispatch.after_commit) == 1
+        assert len(session.dispatch.after_soft_rollback) == 1
+
+    def test_rollback_discards(self):  # noqa
+        repo = BaseSQLAlchemyRepository(self.kerno, session_factory=self.sas)
+        repo.events.broadcast(Happened(1))
+        self.sas.execute(sqlalchemy.text("SELECT 1"))  # begin a transaction
+        self.sas.rollback()
+        self.sas.commit()
+        self.hub.shutdown()
+        assert self.received == []
+
+    def test_savepoint_rollback(self):  # noqa
+        repo = BaseSQLAlchemyRepository(self.kerno, session_factory=self.sas)
+        repo.events.broadcast(Happened(1))
+        savepoint = self.sas.begin_nested()
+        repo.events.broadcast(Happened(2))
+        savepoint.rollback()
+        savepoint = self.sas.begin_nested()
+        repo.events.broadcast(Happened(3))
+        savepoint.commit()
+        self.sas.commit()
+        self.hub.shutdown()
+        assert self.received == [1, 3]
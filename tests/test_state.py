@@ -18,7 +18,7 @@ class TestUIMessage(TestCase):
     def test_ui_message_to_dict(self):  # noqa
         examined = self._make_one()
         adict = to_dict(examined)
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["title"] == "Prokofiev is the best!"
         assert adict["plain"] == "We like Prokofiev here."
         assert adict["html"] == ""
@@ -52,7 +52,7 @@ class TestRezulto(TestCase):
     def test_rezulto_to_dict(self):  # noqa
         examined = self._make_one()
         adict = to_dict(examined)
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["status_int"] == 200
         assert adict["level"] == "success"
         assert adict["messages"] == []
@@ -98,7 +98,7 @@ class TestMalbonaRezulto(TestCase):
     def test_malbona_to_dict(self):  # noqa
         examined = self._make_one()
         adict = to_dict(examined)
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["status_int"] == 400
         assert adict["level"] == "danger"
         assert adict["messages"] == []
@@ -0,0 +1,74 @@
+"""Tests for the kerno.web.binary module."""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import TestCase
+
+from kerno.typing import DictStr
+from kerno.web.binary import cbor_dumps, jsonright_binary
+from kerno.web.jsonright import entity2dict, jsonright
+
+
+class TestCborDumps(TestCase):
+    """Examples from RFC 8949, appendix A."""
+
+    def test_integers(self):  # noqa
+        assert cbor_dumps(0) == bytes.fromhex("00")
+        assert cbor_dumps(24) == bytes.fromhex("1818")
+        assert cbor_dumps(1000000) == bytes.fromhex("1a000f4240")
+        assert cbor_dumps(-1000) == bytes.fromhex("3903e7")
+        assert cbor_dumps(18446744073709551616) == bytes.fromhex(
+            "c249010000000000000000"
+        )
+
+    def test_simple_values(self):  # noqa
+        assert cbor_dumps(1.1) == bytes.fromhex("fb3ff199999999999a")
+        assert cbor_dumps([False, True, None]) == bytes.fromhex("83f4f5f6")
+
+    def test_strings(self):  # noqa
+        assert cbor_dumps("ü") == bytes.fromhex("62c3bc")
+        assert cbor_dumps(b"\x01\x02\x03\x04") == bytes.fromhex("4401020304")
+
+    def test_dict(self):  # noqa
+        assert cbor_dumps({"a": 1, "b": [2, 3]}) == bytes.fromhex("a26161016162820203")
+
+    def test_datetime(self):  # noqa
+        moment = datetime(2013, 3, 21, 20, 4, 0, tzinfo=timezone.utc)
+        assert cbor_dumps(moment) == bytes.fromhex(
+            "c074323031332d30332d32315432303a30343a30305a"
+        )
+        assert cbor_dumps(moment.replace(tzinfo=None)) == cbor_dumps(moment)
+
+    def test_date(self):  # noqa
+        assert cbor_dumps(date(1940, 10, 9)) == bytes.fromhex(
+            "d903ec6a313934302d31302d3039"
+        )
+
+    def test_decimal(self):  # noqa
+        assert cbor_dumps(Decimal("273.15")) == bytes.fromhex("c48221196ab3")
+
+    def test_unknown_type(self):  # noqa
+        with self.assertRaises(TypeError):
+            cbor_dumps(object())
+
+
+class Invoice:  # noqa
+    def __init__(self):  # noqa
+        self.due = date(2020, 9, 27)
+        self.total = Decimal("273.15")
+
+
+@jsonright.register(Invoice)
+def _(obj, peto, features=(), **kw) -> DictStr:
+    return entity2dict(obj, native=kw.get("native", False))
+
+
+class TestJsonrightBinary(TestCase):  # noqa
+    def test_native_types(self):  # noqa
+        assert jsonright(Invoice(), None, native=True) == {
+            "due": date(2020, 9, 27),
+            "total": Decimal("273.15"),
+        }
+        assert jsonright_binary([Invoice()], None) == cbor_dumps(
+            [["due", date(2020, 9, 27)], ["total", Decimal("273.15")]]
+        )
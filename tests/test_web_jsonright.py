@@ -1,10 +1,32 @@
 """Tests for the kerno.web.jsonright module."""
 
-from datetime import datetime
-from unittest import TestCase
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from json import loads
+from unittest import skipIf, TestCase
 
 from kerno.typing import DictStr
-from kerno.web.jsonright import entity2dict, jsonright
+from kerno.web.jsonright import (
+    FORMAT_VERSION,
+    JsonrightMemo,
+    SnapshotCache,
+    encoders,
+    entity2dict,
+    get_sane_var_names,
+    jsonright,
+    jsonright_stream,
+    memoized,
+    pivot_parallel,
+    var_names,
+)
+
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None  # type: ignore[assignment]
 
 
 class TestDefaultJsonrightImplementation(TestCase):
@@ -122,3 +144,454 @@ class TestListOfEntities(TestCase):  # noqa
             ["profession1", "Python developer"],
             ["birth", "1976-07-18T00:00:00"],
         ]
+
+
+class Counted:  # noqa
+    calls = 0
+
+    def __init__(self, id, price):  # noqa
+        self.id = id
+        self.price = price
+
+
+@jsonright.register(Counted)
+def _(obj, peto, features=(), **kw) -> DictStr:
+    Counted.calls += 1
+    return {"id": obj.id, "price": obj.price}
+
+
+class TestPivot(TestCase):  # noqa
+    def test_each_entity_encoded_once(self):  # noqa
+        Counted.calls = 0
+        right = jsonright([Counted(1, Decimal("2.5")), Counted(2, None)], None)
+        assert Counted.calls == 2
+        assert right == [["id", 1, 2], ["price", 2.5, None]]
+
+    def test_fields_differ(self):  # noqa
+        with self.assertRaises(RuntimeError):
+            jsonright([Counted(1, 2), MyModel()], None)
+
+
+class TestCompiledEncoders(TestCase):  # noqa
+    def setUp(self):  # noqa
+        encoders.clear()
+
+    def tearDown(self):  # noqa
+        encoders.enabled = True
+
+    def test_encoder_is_reused(self):  # noqa
+        first = entity2dict(MyModel())
+        assert len(encoders) == 1
+        second = entity2dict(MyModel())
+        assert len(encoders) == 1
+        assert first == second
+        entity2dict(MyModel(), keys=["name"])
+        assert len(encoders) == 2
+
+    def test_single_key(self):  # noqa
+        assert entity2dict(MyModel(), keys=("birth",)) == {
+            "birth": "1976-07-18T00:00:00"
+        }
+
+    def test_disabled_gives_same_result(self):  # noqa
+        compiled = entity2dict(MyModel())
+        encoders.enabled = False
+        assert entity2dict(MyModel()) == compiled
+        assert len(encoders) == 1
+
+
+class TestStream(TestCase):  # noqa
+    def _stream(self, payload, **kw):
+        return loads(b"".join(jsonright_stream(payload, None, **kw)))
+
+    def test_empty(self):  # noqa
+        assert self._stream(iter(())) == []
+
+    def test_primitives(self):  # noqa
+        assert self._stream(iter([1, None, "a"]), chunk_size=2) == [1, None, "a"]
+
+    def test_same_as_jsonright(self):  # noqa
+        payload = [Counted(i, Decimal(i) / 4) for i in range(25)]
+        streamed = self._stream(iter(payload), chunk_size=7, spool_size=16)
+        assert streamed == jsonright(payload, None)
+
+    def test_blocks(self):  # noqa
+        payload = [Counted(i, i * 2) for i in range(5)]
+        stream = b"".join(jsonright_stream(iter(payload), None, block_size=2))
+        assert stream.count(b"\n") == 4  # one line per block, plus header & end
+        assert loads(stream) == jsonright(payload, None, block_size=2)
+
+
+class TestBlocks(TestCase):  # noqa
+    def test_blocks(self):  # noqa
+        payload = [Counted(i, i * 2) for i in range(5)]
+        right = jsonright(payload, None, block_size=2)
+        assert right["jsonright"] == FORMAT_VERSION
+        assert right["blocks"] == [
+            [["id", 0, 1], ["price", 0, 2]],
+            [["id", 2, 3], ["price", 4, 6]],
+            [["id", 4], ["price", 8]],
+        ]
+
+
+class TestDictionaryEncoding(TestCase):  # noqa
+    def test_dictionary(self):  # noqa
+        statuses = ["active", "active", "blocked", None, "active", None, "active"]
+        payload = [Counted(i, status) for i, status in enumerate(statuses)]
+        right = jsonright(payload, None, dictionary=255)
+        assert right["jsonright"] == FORMAT_VERSION
+        assert right["blocks"] == [
+            [
+                ["id", 0, 1, 2, 3, 4, 5, 6],
+                [["price", ["active", "blocked", None]], 0, 0, 1, 2, 0, 2, 0],
+            ]
+        ]
+
+    def test_too_many_distinct_values(self):  # noqa
+        payload = [Counted(i, str(i % 3)) for i in range(6)]
+        right = jsonright(payload, None, dictionary=2)
+        assert right["blocks"][0][1] == ["price", "0", "1", "2", "0", "1", "2"]
+
+    def test_stream(self):  # noqa
+        payload = [Counted(i, "same") for i in range(5)]
+        stream = b"".join(jsonright_stream(iter(payload), None, dictionary=9))
+        assert loads(stream) == jsonright(payload, None, dictionary=9)
+
+
+class Slotted:  # noqa
+    __slots__ = ("id", "password", "__weakref__")
+
+    def __init__(self):  # noqa
+        self.id = 7
+        self.password = "secret"
+
+
+class SlottedChild(Slotted):  # noqa
+    __slots__ = "name"
+
+    def __init__(self):  # noqa
+        super().__init__()
+        self.name = "Adam"
+
+
+@dataclass
+class Point:  # noqa
+    x: int
+    _y: int = 0
+
+
+class TestVarNames(TestCase):  # noqa
+    def setUp(self):  # noqa
+        var_names.forget()
+
+    def test_slots(self):  # noqa
+        assert get_sane_var_names(SlottedChild()) == ("id", "name")
+        assert entity2dict(SlottedChild()) == {"id": 7, "name": "Adam"}
+
+    def test_unset_slots(self):  # noqa
+        entity = SlottedChild.__new__(SlottedChild)
+        entity.id = 8
+        assert entity2dict(entity) == {"id": 8}
+        assert entity2dict(SlottedChild()) == {"id": 7, "name": "Adam"}
+
+    def test_dataclass(self):  # noqa
+        assert get_sane_var_names(Point(1, 2)) == ("x", "_y")
+
+    @skipIf(sqlalchemy is None, "SQLAlchemy is not installed")
+    def test_sqlalchemy_loaded_attributes(self):  # noqa
+        from sqlalchemy import Column, ForeignKey, Integer, String
+        from sqlalchemy.orm import declarative_base, deferred, relationship, Session
+
+        Base = declarative_base()
+
+        class Parent(Base):  # noqa
+            __tablename__ = "parent"
+            id = Column(Integer, primary_key=True)
+
+        class Child(Base):  # noqa
+            __tablename__ = "child"
+            id = Column(Integer, primary_key=True)
+            bio = deferred(Column(String))
+            parent_id = Column(ForeignKey(Parent.id))
+            parent = relationship(Parent)
+
+        engine = sqlalchemy.create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as sas:
+            sas.add(Child(id=1, bio="Long", parent=Parent(id=2)))
+            sas.commit()
+        with Session(engine) as sas:
+            child = sas.get(Child, 1)
+            child.parent  # load the relationship
+            sas.expunge_all()
+        # No DetachedInstanceError for the deferred column
+        assert sorted(get_sane_var_names(child)) == ["id", "parent", "parent_id"]
+
+    @skipIf(sqlalchemy is None, "SQLAlchemy is not installed")
+    def test_sqlalchemy_mapped_as_dataclass(self):  # noqa
+        from sqlalchemy.orm import (
+            DeclarativeBase,
+            Mapped,
+            mapped_column,
+            MappedAsDataclass,
+            Session,
+        )
+
+        class Base(MappedAsDataclass, DeclarativeBase):  # noqa
+            pass
+
+        class Book(Base):  # noqa
+            __tablename__ = "book"
+            id: Mapped[int] = mapped_column(primary_key=True)
+            text: Mapped[str] = mapped_column(deferred=True, default="")
+
+        engine = sqlalchemy.create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as sas:
+            sas.add(Book(id=1, text="Long"))
+            sas.commit()
+        with Session(engine) as sas:
+            book = sas.get(Book, 1)
+            sas.expunge_all()
+        assert entity2dict(book) == {"id": 1}
+        encoders.enabled = False
+        self.addCleanup(setattr, encoders, "enabled", True)
+        assert entity2dict(book) == {"id": 1}
+
+    def test_plain_objects_can_vary(self):  # noqa
+        entity = MyModel()
+        entity.extra = 1
+        assert "extra" in get_sane_var_names(entity)
+        assert "extra" not in get_sane_var_names(MyModel())
+
+    def test_forget(self):  # noqa
+        get_sane_var_names(Point(1))
+        get_sane_var_names(MyModel())
+        var_names.forget(Point)
+        assert Point not in var_names._per_class
+        assert MyModel in var_names._per_class
+        var_names.forget()
+        assert not var_names._per_keys
+
+
+class Unpicklable:  # noqa
+    def __reduce__(self):  # noqa
+        raise AssertionError("The peto must not be pickled.")
+
+
+class TestParallel(TestCase):  # noqa
+    payload = [Counted(i, Decimal(i)) for i in range(50)]
+
+    def test_threads(self):  # noqa
+        with ThreadPoolExecutor(2) as pool:
+            right = jsonright(
+                self.payload, None, executor=pool, chunk_size=7, min_rows=1
+            )
+        assert right == jsonright(self.payload, None)
+
+    def test_processes_do_not_receive_peto(self):  # noqa
+        with ProcessPoolExecutor(2) as pool:
+            right = pivot_parallel(
+                self.payload, Unpicklable(), (), pool, chunk_size=20, min_rows=1
+            )
+        assert right == jsonright(self.payload, None)
+
+    def test_below_threshold(self):  # noqa
+        with ThreadPoolExecutor(1) as pool:
+            assert pivot_parallel(self.payload, None, (), pool) == jsonright(
+                self.payload, None
+            )
+
+
+class Author:  # noqa
+    encoded = 0
+
+    def __init__(self, name):  # noqa
+        self.name = name
+
+
+@jsonright.register(Author)
+@memoized
+def _(obj, peto, features=(), **kw) -> DictStr:
+    Author.encoded += 1
+    return {"name": obj.name}
+
+
+class Comment:  # noqa
+    def __init__(self, text, author):  # noqa
+        self.text = text
+        self.author = author
+
+
+@jsonright.register(Comment)
+def _(obj, peto, features=(), **kw) -> DictStr:
+    return {"text": obj.text, "author": jsonright(obj.author, peto, features, **kw)}
+
+
+class FakePeto:  # noqa
+    pass
+
+
+class TestMemo(TestCase):  # noqa
+    def setUp(self):  # noqa
+        Author.encoded = 0
+        author = Author("Chopin")
+        self.comments = [Comment(str(i), author) for i in range(4)]
+
+    def test_without_memo(self):  # noqa
+        jsonright(self.comments, FakePeto())
+        assert Author.encoded == 4
+
+    def test_with_memo(self):  # noqa
+        peto = FakePeto()
+        memo = JsonrightMemo.attach(peto)
+        right = jsonright(self.comments, peto)
+        assert right[1] == ["author"] + [{"name": "Chopin"}] * 4
+        assert Author.encoded == 1
+        jsonright(self.comments, peto, features={"other"})
+        assert Author.encoded == 2
+        assert memo.stats() == {
+            "hits": 6,
+            "misses": 2,
+            "size": 2,
+            "by_type": {"Author": {"hits": 6, "misses": 2}},
+        }
+
+
+class TestUnion(TestCase):  # noqa
+    def test_union(self):  # noqa
+        payload = [Counted(1, 0), Comment("Hi", Author("Liszt")), Counted(2, 3)]
+        right = jsonright(payload, None, union=True, type_tag="__type__")
+        assert right["blocks"] == [
+            [
+                [{"key": "id", "absent": 0}, 1, 0, 2],
+                [{"key": "price", "absent": 1}, 0, 1, 3],
+                [{"key": "text", "absent": 0}, 0, "Hi", 0],
+                [{"key": "author", "absent": 0}, 0, {"name": "Liszt"}, 0],
+                ["__type__", "Counted", "Comment", "Counted"],
+            ]
+        ]
+
+    def test_homogeneous_columns_stay_plain(self):  # noqa
+        right = jsonright([Counted(1, 2), Counted(3, 4)], None, union=True)
+        assert right["blocks"] == [[["id", 1, 3], ["price", 2, 4]]]
+
+
+class Order:  # noqa
+    def __init__(self, id, items):  # noqa
+        self.id = id
+        self.items = items
+
+
+@jsonright.register(Order)
+def _(obj, peto, features=(), **kw) -> DictStr:
+    return {"id": obj.id, "items": obj.items}  # pivot() encodes the list
+
+
+class TestNested(TestCase):  # noqa
+    def test_nested(self):  # noqa
+        payload = [
+            Order(1, [Counted("A7", 1), Counted("B2", 5)]),
+            Order(2, [Counted("C3", 2)]),
+            Order(3, []),
+        ]
+        right = jsonright(payload, None, nested=True)
+        assert right["schemas"] == [["id", "price"]]
+        assert right["blocks"] == [
+            [
+                ["id", 1, 2, 3],
+                [
+                    {"key": "items", "nested": True},
+                    [0, ["A7", "B2"], [1, 5]],
+                    [0, ["C3"], [2]],
+                    [],
+                ],
+            ]
+        ]
+
+    def test_not_nested(self):  # noqa
+        right = jsonright([Order(1, [Counted("A7", 1)])], None)
+        assert right == [["id", 1], ["items", [["id", "A7"], ["price", 1]]]]
+
+
+class TestDelta(TestCase):  # noqa
+    def test_delta(self):  # noqa
+        cache = SnapshotCache(max_versions=2)
+        first = jsonright([Counted(1, 10), Counted(2, 20)], None, snapshots=cache)
+        assert first["blocks"] == [[["id", 1, 2], ["price", 10, 20]]]
+        payload = [Counted(2, 21), Counted(3, 30)]
+        right = jsonright(payload, None, snapshots=cache, since=first["version"])
+        assert right["since"] == first["version"]
+        assert right["delta"] == {
+            "added": [["id", 3], ["price", 30]],
+            "changed": [["id", 2], ["price", 21]],
+            "removed": [1],
+        }
+        again = jsonright(payload, None, snapshots=cache, since=right["version"])
+        assert again["version"] == right["version"]
+        assert again["delta"]["changed"] == [["id"], ["price"]]
+
+    def test_order(self):  # noqa
+        cache = SnapshotCache()
+        old = [Counted(id, 0) for id in "qpon"]
+        first = jsonright(old, None, snapshots=cache)
+        new = [Counted(id, 1) for id in "zyxwvqpo"]
+        right = jsonright(new, None, snapshots=cache, since=first["version"])
+        assert right["delta"]["added"][0] == ["id", *"zyxwv"]
+        assert right["delta"]["changed"][0] == ["id", *"qpo"]
+        right = jsonright(old, None, snapshots=cache, since=right["version"])
+        assert right["delta"]["removed"] == [*"zyxwv"]
+
+    def test_full_cache(self):  # noqa
+        cache = SnapshotCache(max_versions=1)
+        first = jsonright([Counted(1, 10)], None, snapshots=cache)
+        right = jsonright(
+            [Counted(1, 11)], None, snapshots=cache, since=first["version"]
+        )
+        assert right["delta"]["changed"] == [["id", 1], ["price", 11]]
+        assert len(cache) == 1
+
+    def test_unknown_version(self):  # noqa
+        cache = SnapshotCache(max_versions=1)
+        first = jsonright([Counted(1, 10)], None, snapshots=cache)
+        jsonright([Counted(1, 11)], None, snapshots=cache)  # evicts first
+        assert len(cache) == 1
+        right = jsonright(
+            [Counted(1, 12)], None, snapshots=cache, since=first["version"]
+        )
+        assert "delta" not in right
+        assert right["blocks"] == [[["id", 1], ["price", 12]]]
+
+
+Row = namedtuple("Row", ["id", "price", "created"])
+
+
+class TestRows(TestCase):  # noqa
+    rows = [
+        Row(1, Decimal("1.5"), date(2020, 1, 2)),
+        Row(2, Decimal("2.5"), date(2020, 1, 3)),
+    ]
+
+    def test_pivot_rows(self):  # noqa
+        assert jsonright(self.rows, None) == [
+            ["id", 1, 2],
+            ["price", 1.5, 2.5],
+            ["created", "2020-01-02", "2020-01-03"],
+        ]
+
+    def test_single_row(self):  # noqa
+        assert jsonright(self.rows[0], None, native=True) == {
+            "id": 1,
+            "price": Decimal("1.5"),
+            "created": date(2020, 1, 2),
+        }
+
+    def test_rows_in_blocks(self):  # noqa
+        right = jsonright(self.rows, None, block_size=1)
+        assert right["blocks"][1] == [
+            ["id", 2],
+            ["price", 2.5],
+            ["created", "2020-01-03"],
+        ]
+        stream = loads(b"".join(jsonright_stream(self.rows, None)))
+        assert stream == jsonright(self.rows, None)
@@ -0,0 +1,66 @@
+"""Tests for the kerno.web.pyramid module."""
+
+from json import loads
+from unittest import skipIf, TestCase
+
+from kerno.web.binary import jsonright_binary
+from kerno.web.jsonright import entity2dict, jsonright
+
+try:
+    from pyramid import testing
+    from pyramid.request import Request
+
+    from kerno.web.pyramid import jsonright_response
+except ImportError:
+    testing = None  # type: ignore[assignment]
+
+
+class Product:  # noqa
+    def __init__(self, id: int) -> None:  # noqa
+        self.id = id
+
+
+@jsonright.register(Product)
+def _product(obj: Product, peto, features=(), **kw):
+    return entity2dict(obj, native=kw.get("native", False))
+
+
+@skipIf(testing is None, "Pyramid is not installed")
+class TestJsonrightResponse(TestCase):  # noqa
+    def setUp(self):  # noqa
+        self.config = testing.setUp()
+        self.addCleanup(testing.tearDown)
+
+    def request(self, accept: str) -> "Request":  # noqa
+        request = Request.blank("/products", headers={"Accept": accept})
+        request.registry = self.config.registry
+        return request
+
+    def test_json_is_streamed(self):  # noqa
+        produced: list[int] = []
+
+        def rows():
+            for id in range(3):
+                produced.append(id)
+                yield Product(id)
+
+        response = jsonright_response(self.request("application/json"), rows(), None)
+        assert produced == []  # nothing is read before the server iterates
+        assert response.content_type == "application/json"
+        assert response.vary == ("Accept",)
+        body = b"".join(response.app_iter)
+        assert produced == [0, 1, 2]
+        assert loads(body) == jsonright([Product(id) for id in range(3)], None)
+
+    def test_binary_negotiation(self):  # noqa
+        products = [Product(1), Product(2)]
+        request = self.request("application/cbor, application/json;q=0.5")
+        response = jsonright_response(request, iter(products), None)
+        assert response.content_type == "application/cbor"
+        assert response.vary == ("Accept",)
+        assert response.body == jsonright_binary(products, None)
+
+    def test_default_is_json(self):  # noqa
+        response = jsonright_response(self.request("text/html"), [Product(1)], None)
+        assert response.content_type == "application/json"
+        assert loads(b"".join(response.app_iter)) == jsonright([Product(1)], None)
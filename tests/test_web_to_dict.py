@@ -1,6 +1,5 @@
 """Tests for the kerno.web.to_dict module."""
 
-from collections import OrderedDict
 from datetime import datetime
 from unittest import TestCase
 from kerno.web.to_dict import reuse_dict, to_dict
@@ -51,7 +50,7 @@ class TestDefaultToDictImplementation(TestCase):
     def test_to_dict_plainly(self):
         entity = MyModel()
         adict = to_dict(entity)
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["name"] == "Nando Florestan"
         assert adict["profession1"] == "Python developer"
         assert adict["birth"] == "1976-07-18T00:00:00"  # a string!
@@ -61,7 +60,7 @@ class TestDefaultToDictImplementation(TestCase):
     def test_to_dict_with_keys(self):
         entity = MyModel()
         adict = to_dict(entity, keys=["name"])
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["name"] == "Nando Florestan"
         with self.assertRaises(KeyError):
             adict["birth"]
@@ -71,7 +70,7 @@ class TestDefaultToDictImplementation(TestCase):
     def test_to_dict_not_for_json(self):
         entity = MyModel()
         adict = to_dict(entity, for_json=False)
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["name"] == "Nando Florestan"
         assert adict["profession1"] == "Python developer"
         assert adict["birth"] == datetime(1976, 7, 18)  # not a string
@@ -87,7 +86,7 @@ class TestCustomToDictImplementation(TestCase):
     def test_to_dict_2(self):
         entity = MyModelSubclass()
         adict = to_dict(entity)
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["name"] == "Nando Florestan"
         assert adict["profession2"] == "Classical music composer"
         with self.assertRaises(KeyError):
@@ -100,7 +99,7 @@ class TestCustomToDictImplementation(TestCase):
     def test_verbose(self):
         entity = MyModelSubclass()
         adict = to_dict(entity, flavor="verbose")
-        assert isinstance(adict, OrderedDict)
+        assert isinstance(adict, dict)
         assert adict["name"] == "Nando Florestan"
         assert adict["profession2"] == "Classical music composer"
         assert adict["profession1"] == "Python developer"
@@ -108,3 +107,30 @@ class TestCustomToDictImplementation(TestCase):
         assert adict["__class__"] == "MyModelSubclass"
         with self.assertRaises(KeyError):
             adict["password"]
+
+
+class TestDispatchCache(TestCase):
+    """Test cases for the dispatch resolution cache of to_dict()."""
+
+    def test_hits_and_misses(self):
+        lookup = to_dict.key_lookup
+        lookup.clear()
+        before = lookup.stats()
+        to_dict(MyModel())
+        to_dict(MyModel())
+        after = lookup.stats()
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+        assert after["size"] == 1
+
+    def test_registration_invalidates(self):
+        class Brand(MyModel):
+            pass
+
+        assert "__class__" not in to_dict(Brand())
+
+        @to_dict.register(obj=Brand, flavor="")
+        def brand_to_dict(obj, flavor="", **kw):
+            return {"__class__": "Brand"}
+
+        assert to_dict(Brand()) == {"__class__": "Brand"}